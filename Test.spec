@@ -1,6 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
 
 
+# Unused stdlib modules and packages (Test.py only needs Tk): less to bundle and to load
+EXCLUDES = [
+    'unittest', 'doctest', 'pdb', 'pydoc', 'lib2to3', 'distutils', 'setuptools', 'pip', 'ensurepip',
+    'venv', 'xmlrpc', 'turtle', 'turtledemo', 'idlelib', 'tkinter.tix', 'tkinter.test', 'test',
+    'curses', 'openpyxl', 'numpy', 'pyarrow', 'pandas', 'sqlite3',
+]
+
+# Tcl time zones and Tk demos are never used: hundreds of files fewer to unpack
+TK_UNUSED = ('_tcl_data/tzdata', '_tk_data/demos', '_tk_data/images')
+
 a = Analysis(
     ['Test.py'],
     pathex=[],
@@ -10,10 +20,11 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     noarchive=False,
     optimize=0,
 )
+a.datas = [entry for entry in a.datas if not entry[0].replace('\\', '/').startswith(TK_UNUSED)]
 pyz = PYZ(a.pure)
 
 exe = EXE(
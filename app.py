@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox
 
+from gas_model import Station, Network
+from gas_widgets import VirtualGrid
+
 # Scrollable frame with mouse wheel support
 class ScrollableFrame(tk.Frame):
     def __init__(self, container, *args, **kwargs):
@@ -64,13 +67,15 @@ class GasCalculatorFlexible:
         self.station_frame.grid(row=2, column=0, columnspan=3, sticky="nsew", pady=10, padx=10)
 
         self.calculate_button = None
-        self.station_pump_entries = []
+        self.live_totals = tk.Label(root, font=("Arial", 11), bg="#e0e0e0")
+        self.live_totals.grid(row=5, column=0, columnspan=3, pady=5)
+        self.stations = []
 
     # Step 1: Input number of pumps per station
     def create_station_entries(self):
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
-        self.station_pump_entries = []
+        self.stations = []
 
         try:
             self.num_stations = int(self.num_stations_entry.get())
@@ -103,52 +108,46 @@ class GasCalculatorFlexible:
 
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
-        self.station_pump_entries = []
-
-        row_offset = 0
-        for s_index, pumps in enumerate(self.station_pumps):
-            # Station frame
-            station_border = tk.Frame(self.station_frame.scrollable_frame, bd=2, relief="groove", padx=5, pady=5, bg="#ffffff")
-            station_border.grid(row=row_offset, column=0, columnspan=4, pady=5, sticky="ew")
-            row_offset += 1
-
-            tk.Label(station_border, text=f"Station {s_index+1}", font=("Arial", 12, "bold"), bg="#ffffff").grid(row=0, column=0, columnspan=4, pady=2)
-
-            # Column headers
-            tk.Label(station_border, text="Pump #", font=("Arial", 11, "bold"), bg="#ffffff").grid(row=1, column=0, padx=5)
-            tk.Label(station_border, text="Initial", font=("Arial", 11, "bold"), bg="#ffffff").grid(row=1, column=1, padx=5)
-            tk.Label(station_border, text="Final", font=("Arial", 11, "bold"), bg="#ffffff").grid(row=1, column=2, padx=5)
-
-            station_entries = []
-            for p in range(pumps):
-                bg_color = "#f9f9f9" if p % 2 == 0 else "#e6f2ff"
-                tk.Label(station_border, text=f"{p+1}", bg=bg_color, width=8).grid(row=p+2, column=0)
-                initial_entry = tk.Entry(station_border, width=10, bg=bg_color)
-                initial_entry.grid(row=p+2, column=1, padx=5)
-                final_entry = tk.Entry(station_border, width=10, bg=bg_color)
-                final_entry.grid(row=p+2, column=2, padx=5)
-                station_entries.append((initial_entry, final_entry))
-            self.station_pump_entries.append(station_entries)
+
+        # The grid is a view over the headless station model
+        self.stations = [Station(s_index + 1, pumps) for s_index, pumps in enumerate(self.station_pumps)]
+        self.network = Network(self.stations, on_change=self.show_live_totals)
+
+        self.pump_grid = VirtualGrid(self.station_frame.scrollable_frame,
+                                     [("Station", 12, "station_name", False), ("Pump #", 8, "number", False),
+                                      ("Initial", 10, "initial_text", True), ("Final", 10, "final_text", True)],
+                                     visible_rows=14, row_bg=lambda pump: "#f9f9f9" if pump.number % 2 == 1 else "#e6f2ff",
+                                     bg="#ffffff", bd=2, relief="groove", padx=5, pady=5)
+        self.pump_grid.grid(row=0, column=0, columnspan=4, pady=5, sticky="ew")
+        self.pump_grid.set_rows([pump for station in self.stations for pump in station.pumps])
 
         if self.calculate_button:
             self.calculate_button.destroy()
 
         self.calculate_button = tk.Button(self.root, text="Calculate Totals", font=("Arial", 12), command=self.calculate_totals, bg="#FF5722", fg="white")
         self.calculate_button.grid(row=3, column=0, columnspan=3, pady=10)
+        self.show_live_totals(self.network)
+
+    # Running totals, updated on every edit
+    def show_live_totals(self, network):
+        text = f"Total: {network.liters:.2f} liters"
+        if network.missing:
+            text += f" ({network.missing} pumps incomplete)"
+        self.live_totals.config(text=text)
 
     # Step 3: Calculate totals
     def calculate_totals(self):
         grand_total = 0
         result_text = ""
         try:
-            for s_index, station in enumerate(self.station_pump_entries):
+            for station in self.stations:
                 station_total = 0
-                for initial_entry, final_entry in station:
-                    initial = float(initial_entry.get())
-                    final = float(final_entry.get())
-                    station_total += final - initial
+                for pump in station.pumps:
+                    if pump.liters is None:
+                        raise ValueError
+                    station_total += pump.liters
                 grand_total += station_total
-                result_text += f"Station {s_index+1} total: {station_total} liters\n"
+                result_text += f"{station.name} total: {station_total} liters\n"
             result_text += f"\nGrand Total: {grand_total} liters"
             messagebox.showinfo("Totals", result_text)
         except ValueError:
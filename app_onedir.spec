@@ -0,0 +1,59 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Startup-optimised build of app.spec: one folder instead of one file, so
+# a launch does not unpack the bundle to a temp dir, and no UPX to decompress.
+#
+#   pyinstaller app_onedir.spec   ->   dist/app_onedir/app.exe
+
+
+# Unused stdlib modules and packages (app.py only needs Tk): less to bundle and to load
+EXCLUDES = [
+    'unittest', 'doctest', 'pdb', 'pydoc', 'lib2to3', 'distutils', 'setuptools', 'pip', 'ensurepip',
+    'venv', 'xmlrpc', 'turtle', 'turtledemo', 'idlelib', 'tkinter.tix', 'tkinter.test', 'test',
+    'curses', 'openpyxl', 'numpy', 'pyarrow', 'pandas', 'sqlite3',
+]
+
+# Tcl time zones and Tk demos are never used: hundreds of files fewer to unpack
+TK_UNUSED = ('_tcl_data/tzdata', '_tk_data/demos', '_tk_data/images')
+
+a = Analysis(
+    ['app.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUDES,
+    noarchive=False,
+    optimize=0,
+)
+a.datas = [entry for entry in a.datas if not entry[0].replace('\\', '/').startswith(TK_UNUSED)]
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='app',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='app_onedir',
+)
@@ -0,0 +1,845 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import tkinter as tk
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from tkinter import filedialog, messagebox
+
+import openpyxl
+from openpyxl import Workbook
+
+import numpy as np
+
+from gas_batch import run_batch
+from gas_cache import ParseCache
+from gas_incremental import IncrementalImporter
+import gas_db
+import gas_reconcile
+from gas_store import ReadingStore, to_timestamp
+from gas_export import EXPORTERS, ExportJob, report_filename
+from gas_model import build_stations, compute_totals, Network
+from gas_engine import (read_columns, read_excel_columns, aggregate_columns, validate_columns, ExcelReport, KEYS,
+                       list_sources, read_sources, aggregate_categories)
+from gas_widgets import VirtualText, VIRTUAL_THRESHOLD
+import gas_trace
+import test2
+import test3
+
+
+# -----------------------------------------------------
+# Sample data
+# -----------------------------------------------------
+def generate_workbook(file_path, n_rows, stations=200, seed=0):
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["Station", "Pump", "Initial", "Final"])
+    for i in range(n_rows):
+        initial = round(rnd.uniform(0, 100000), 2)
+        ws.append([i % stations + 1, i // stations % 20 + 1, initial, round(initial + rnd.uniform(0, 500), 2)])
+    wb.save(file_path)
+
+
+def generate_columns(n_rows, stations=200, seed=0):
+    # Readings to the centilitre, as validate_columns requires
+    rng = np.random.default_rng(seed)
+    initial = np.round(rng.uniform(0, 100000, n_rows), 2)
+    return {
+        "station": np.arange(n_rows, dtype=np.int64) % stations + 1,
+        "pump": np.arange(n_rows, dtype=np.int64) // stations % 20 + 1,
+        "initial": initial,
+        "final": np.round(initial + rng.uniform(0, 500, n_rows), 2),
+    }
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+# Everything passed to record() is saved by --json and checked by --compare.
+# Metrics ending in _s or _mb are costs: lower is better.
+RESULTS = []
+REGRESSION_RATIO = 1.25
+
+
+def record(benchmark, params, metrics):
+    RESULTS.append({"benchmark": benchmark, "params": params, "metrics": metrics})
+    fields = [f"{key}={str(value):>7}" for key, value in params.items()]
+    fields += [f"{key}={value:9.4f}" if isinstance(value, float) else f"{key}={value}" for key, value in metrics.items()]
+    print(f"{benchmark}  " + "  ".join(fields))
+
+
+# -----------------------------------------------------
+# Row-by-row reference: the import path before the columnar reader, kept to
+# measure against and to check the columnar totals
+
+def iter_excel_rows(file_path):
+    # read_only keeps memory flat: rows are parsed lazily from the sheet XML
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=2, max_col=4, values_only=True):
+            if not row or len(row) < 4 or None in row[:4]:
+                continue
+            station, pump, initial, final = row[:4]
+            yield int(station), int(pump), float(initial), float(final)
+    finally:
+        wb.close()
+
+
+def aggregate_rows(rows):
+    station_totals = {}
+    grand_total = 0
+
+    for station, pump, initial, final in rows:
+        pumped = final - initial
+        station_totals[station] = station_totals.get(station, 0) + pumped
+        grand_total += pumped
+
+    return station_totals, grand_total
+
+
+def full_load_rows(file_path):
+    # Previous import path: the whole workbook is built in memory first
+    wb = openpyxl.load_workbook(file_path, data_only=True)
+    for row in wb.active.iter_rows(min_row=2, values_only=True):
+        if row and row[0] is not None:
+            yield int(row[0]), int(row[1]), float(row[2]), float(row[3])
+
+
+# -----------------------------------------------------
+# Benchmarks
+# -----------------------------------------------------
+def bench_import(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            file_path = os.path.join(tmp, f"meters_{n_rows}.xlsx")
+            generate_workbook(file_path, n_rows)
+            modes = (
+                ("full", lambda: aggregate_rows(full_load_rows(file_path))),
+                ("stream", lambda: aggregate_rows(iter_excel_rows(file_path))),
+                ("columns", lambda: aggregate_columns(read_excel_columns(file_path))[1:]),
+            )
+            results = {}
+            for mode, run in modes:
+                results[mode], elapsed, peak = measure(run)
+                print(f"import  {mode:<7}  rows={n_rows:>9}  time={elapsed:8.3f}s  peak={peak / 1e6:8.2f} MB")
+            print(f"import  same={results['columns'] == results['stream']}")
+
+
+def bench_aggregate(sizes):
+    for n_rows in sizes:
+        columns = generate_columns(n_rows)
+        rows = list(zip(*(columns[key].tolist() for key in ("station", "pump", "initial", "final"))))
+        start = time.perf_counter()
+        expected = aggregate_rows(rows)
+        loop_time = time.perf_counter() - start
+        del rows
+
+        start = time.perf_counter()
+        _, station_totals, grand_total = aggregate_columns(columns)
+        columnar_time = time.perf_counter() - start
+
+        same = (station_totals, grand_total) == expected
+        print(f"aggregate  rows={n_rows:>9}  loop={loop_time:8.3f}s  columnar={columnar_time:8.3f}s  same={same}")
+
+
+def bench_report(sizes):
+    for n_rows in sizes:
+        columns = generate_columns(n_rows)
+        report = ExcelReport(columns, *aggregate_columns(columns))
+
+        start = time.perf_counter()
+        report[0:40]
+        window_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        "".join(report)
+        buffer_time = time.perf_counter() - start
+        print(f"report  rows={n_rows:>9}  window={window_time:8.4f}s  full buffer={buffer_time:8.3f}s")
+
+
+def filled_stations(n_stations, pumps_per_station, seed=0):
+    rnd = random.Random(seed)
+    half = pumps_per_station // 2
+    stations = build_stations([(half, pumps_per_station - half)] * n_stations)
+    for station in stations:
+        station.price_essence_text = "13.5"
+        station.price_gasoil_text = "12.1"
+        for pump in station.pumps:
+            initial = rnd.uniform(0, 100000)
+            pump.initial_text = f"{initial:.2f}"
+            pump.final_text = f"{initial + rnd.uniform(0, 500):.2f}"
+    return stations
+
+
+def bench_totals(sizes):
+    # sizes are station counts, each with 20 pumps
+    for n_stations in sizes:
+        stations = filled_stations(n_stations, 20)
+        network = Network(stations)
+        pump = stations[-1].pumps[-1]
+
+        start = time.perf_counter()
+        compute_totals(stations)
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(1000):
+            pump.final_text = str(100000 + i)
+        edit_time = (time.perf_counter() - start) / 1000
+        print(f"totals  stations={n_stations:>6}  pumps={n_stations * 20:>8}  full={full_time:8.4f}s  per edit={edit_time * 1e6:8.2f}us")
+
+
+def pump_price(pump):
+    # Per-row price column, as an import with a Prix column gives; as in the model, None when unset
+    station = pump.station
+    return station.price_essence if pump.category == "Essence" else station.price_gasoil
+
+
+def bench_categories(sizes):
+    # sizes are station counts, each with 20 pumps: the model path against the
+    # grouped pass over the same readings as columns
+    for n_stations in sizes:
+        stations = filled_stations(n_stations, 20)
+        pumps = [pump for station in stations for pump in station.pumps]
+        columns = {
+            "station": np.array([pump.station.number for pump in pumps], dtype=np.int64),
+            "pump": np.array([pump.number for pump in pumps], dtype=np.int64),
+            "initial": np.array([pump.initial for pump in pumps]),
+            "final": np.array([pump.final for pump in pumps]),
+            "category": np.array([pump.category for pump in pumps]),
+            "price": np.array([pump_price(pump) for pump in pumps], dtype=np.float64),
+        }
+
+        start = time.perf_counter()
+        expected = compute_totals(stations)[2]
+        model = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, grand = aggregate_categories(columns)
+        grouped = time.perf_counter() - start
+        same = grand == expected
+        print(f"categories  stations={n_stations:>6}  model={model:8.4f}s  grouped={grouped:8.4f}s  same={same}")
+
+
+def bench_batch(sizes):
+    # sizes are file counts, each workbook holding 5000 rows
+    workers = [1]
+    while workers[-1] * 2 <= os.cpu_count():
+        workers.append(workers[-1] * 2)
+
+    for n_files in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(n_files):
+                paths.append(os.path.join(tmp, f"meters_{i:04d}.xlsx"))
+                generate_workbook(paths[-1], 5000, seed=i)
+            output_dir = os.path.join(tmp, "out")
+            os.makedirs(output_dir)
+
+            baseline = None
+            for n_workers in workers:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_batch(paths, output_dir, n_workers)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"batch  files={n_files:>5}  workers={n_workers:>3}  time={elapsed:8.3f}s  speedup={baseline / elapsed:5.2f}x")
+
+
+def save_report_in_memory(filename, results, detailed_results):
+    # Previous export path: the whole workbook is kept in memory until save
+    wb = Workbook()
+    ws1 = wb.active
+    ws1.title = "Stations Totaux"
+    for row in results:
+        ws1.append(row)
+    ws2 = wb.create_sheet("Pompes Détails")
+    for row in detailed_results:
+        ws2.append(row)
+    wb.save(filename)
+
+
+def detail_rows(n_rows, seed=0):
+    rnd = random.Random(seed)
+    for i in range(n_rows):
+        initial = rnd.uniform(0, 100000)
+        final = initial + rnd.uniform(0, 500)
+        yield [f"Station {i % 200 + 1}", initial, final, final - initial, "Essence" if i % 2 else "Gasoil"]
+
+
+EXPORT_RESULTS = [[f"Station {s + 1}", 1000.0, 13500.0, 800.0, 9680.0] for s in range(200)]
+
+
+def export_modes():
+    modes = {"memory": ("xlsx", save_report_in_memory)}
+    modes.update((fmt, (fmt, save)) for fmt, save in EXPORTERS.items())
+    return modes
+
+
+def max_rss():
+    import resource
+
+    # Peak resident set size of this process so far: kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_export(mode, n_rows, filename):
+    # Child side of bench_export: prints the time and the peak RSS before and
+    # after the export, as JSON
+    _, save = export_modes()[mode]
+    base = max_rss()
+    start = time.perf_counter()
+    save(filename, EXPORT_RESULTS, detail_rows(n_rows))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"time_s": elapsed, "base": base, "peak": max_rss()}))
+
+
+def bench_export(sizes):
+    # Each mode runs in a fresh interpreter, so ru_maxrss is that export's
+    # peak and not one left by an earlier mode; added_mb is what the export
+    # took above the interpreter and imports
+    if importlib.util.find_spec("resource") is None:
+        print("export  skipped: peak RSS needs the resource module (not on Windows)")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            for mode, (fmt, _) in export_modes().items():
+                filename = os.path.join(tmp, f"report_{n_rows}_{mode}.{fmt}")
+                code = f"import bench; bench.run_export({mode!r}, {n_rows}, {filename!r})"
+                child = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)))
+                result = json.loads(child.stdout.splitlines()[-1])
+                record("export", {"mode": mode, "rows": n_rows}, {
+                    "time_s": result["time_s"],
+                    "rss_mb": result["peak"] / 1e6,
+                    "added_mb": (result["peak"] - result["base"]) / 1e6,
+                })
+
+
+def bench_formats(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            xlsx_path = os.path.join(tmp, f"meters_{n_rows}.xlsx")
+            generate_workbook(xlsx_path, n_rows)
+            columns = read_columns(xlsx_path)
+            header = ["Station", "Pump", "Initial", "Final"]
+
+            paths = {"xlsx": xlsx_path}
+            for fmt in ("csv", "parquet"):
+                if fmt in EXPORTERS:
+                    # The exporters write the detail table to <stem>_Pompes_Details.<fmt>
+                    rows = zip(*(columns[key].tolist() for key in KEYS))
+                    paths[fmt] = EXPORTERS[fmt](os.path.join(tmp, f"meters_{n_rows}.{fmt}"), [], rows, [], header)[1]
+
+            for fmt, path in paths.items():
+                _, elapsed, peak = measure(read_columns, path)
+                print(f"formats  {fmt:<7}  rows={n_rows:>9}  time={elapsed:8.3f}s  peak={peak / 1e6:8.2f} MB")
+
+
+def bench_validate(sizes):
+    # Validation of clean columns against the CSV read it is part of, then
+    # with 1% of the cells left blank or swapped
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            columns = generate_columns(n_rows)
+            file_path = os.path.join(tmp, f"meters_{n_rows}.csv")
+            np.savetxt(file_path, np.column_stack([columns[key] for key in KEYS]), fmt="%.2f", delimiter=",",
+                       header="Station,Pump,Initial,Final", comments="")
+            _, read, _ = measure(read_columns, file_path)
+
+            raw = {key: columns[key].astype(np.float64) for key in KEYS}
+            _, clean, _ = measure(validate_columns, raw)
+            dirty = {key: values.copy() for key, values in raw.items()}
+            dirty["initial"][::200] = np.nan
+            dirty["final"][100::200] = 0
+            result, elapsed, _ = measure(validate_columns, dirty)
+            print(f"validate  rows={n_rows:>9}  csv read={read:8.3f}s  clean={clean:8.3f}s  "
+                  f"dirty={elapsed:8.3f}s  problems={len(result['errors'])}")
+
+
+def bench_sheets(sizes):
+    # sizes are rows per workbook, spread over one sheet per day of a week
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            file_path = os.path.join(tmp, f"week_{n_rows}.xlsx")
+            wb = Workbook(write_only=True)
+            rnd = random.Random(0)
+            for day in range(7):
+                ws = wb.create_sheet(f"Jour{day + 1}")
+                ws.append(["Station", "Pump", "Initial", "Final"])
+                for i in range(n_rows // 7):
+                    initial = round(rnd.uniform(0, 100000), 2)
+                    ws.append([i % 200 + 1, i // 200 % 20 + 1, initial, round(initial + rnd.uniform(0, 500), 2)])
+            wb.save(file_path)
+
+            sources = list_sources([file_path])
+            for workers in (1, os.cpu_count() or 1):
+                _, elapsed, _ = measure(read_sources, sources, workers)
+                print(f"sheets  workers={workers:<3}  rows={n_rows:>9}  time={elapsed:8.3f}s")
+
+
+def bench_cache(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ParseCache(os.path.join(tmp, "cache"))
+        for n_rows in sizes:
+            file_path = os.path.join(tmp, f"meters_{n_rows}.xlsx")
+            generate_workbook(file_path, n_rows)
+            _, cold, _ = measure(cache.read_columns, file_path)
+            _, warm, _ = measure(ParseCache(cache.folder).read_columns, file_path)
+            print(f"cache  rows={n_rows:>9}  cold={cold:8.3f}s  warm={warm * 1000:8.2f}ms")
+
+
+def bench_store(sizes):
+    # sizes are total readings, spread over one year of daily appends
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ReadingStore(tmp)
+            per_day = max(1, n_rows // 365)
+            day = to_timestamp("2025-01-01")
+            for d in range(365):
+                columns = generate_columns(per_day, seed=d)
+                store.append(columns["station"], columns["pump"], columns["initial"], columns["final"], day + d * 86400)
+
+            _, elapsed, peak = measure(store.liters_by, "station", "2025-03-01", "2025-04-01")
+            print(f"store  rows={len(store):>9}  march query={elapsed * 1000:8.2f}ms  peak={peak / 1e6:8.2f} MB")
+
+
+def bench_db(sizes):
+    # sizes are day counts, each day holding 200 stations x 20 pumps
+    for n_days in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = gas_db.connect(os.path.join(tmp, "readings.db"))
+            rows = [list(row) for row in detail_rows(4000)]
+            start = time.perf_counter()
+            for d in range(n_days):
+                gas_db.save_day(conn, f"{2024 + d // 365}-{d % 365 // 31 + 1:02d}-{d % 31 + 1:02d}", rows)
+            insert_time = (time.perf_counter() - start) / n_days
+
+            start = time.perf_counter()
+            gas_db.totals_by_station(conn, "2024-03-01", "2024-04-01")
+            query_time = time.perf_counter() - start
+            conn.close()
+            print(f"db  days={n_days:>5}  rows={n_days * 4000:>9}  save/day={insert_time:8.3f}s  march query={query_time:8.3f}s")
+
+
+def bench_reconcile(sizes):
+    # sizes are archive lengths in days (200 stations x 20 pumps each); the
+    # time to add and reconcile one more day should not grow with them
+    for n_days in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = gas_reconcile.connect_archive(os.path.join(tmp, "readings.db"))
+            rows = [list(row) for row in detail_rows(4000)]
+            dates = [(datetime(2020, 1, 1) + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(n_days + 1)]
+            for date in dates[:-1]:
+                gas_db.save_day(conn, date, rows)
+            gas_reconcile.rebuild(conn)
+
+            start = time.perf_counter()
+            gas_reconcile.add_day(conn, dates[-1], rows)
+            add_time = time.perf_counter() - start
+            conn.close()
+            print(f"reconcile  days={n_days:>5}  rows={n_days * 4000:>9}  add one day={add_time:8.3f}s")
+
+
+def bench_incremental(sizes):
+    # A CSV log of n rows grows by 1% and is imported again
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            columns = generate_columns(n_rows + n_rows // 100)
+            lines = [
+                f"{s},{p},{i},{f}\n"
+                for s, p, i, f in zip(*(columns[key].tolist() for key in ("station", "pump", "initial", "final")))
+            ]
+            file_path = os.path.join(tmp, "meters.csv")
+            with open(file_path, "w") as f:
+                f.write("Station,Pump,Initial,Final\n")
+                f.writelines(lines[:n_rows])
+
+            importer = IncrementalImporter(os.path.join(tmp, "state"))
+            _, first, _ = measure(importer.import_file, file_path)
+            with open(file_path, "a") as f:
+                f.writelines(lines[n_rows:])
+            _, again, _ = measure(importer.import_file, file_path)
+            _, full, _ = measure(read_columns, file_path)
+            print(f"incremental  rows={n_rows:>9}  first={first:8.3f}s  +1%={again:8.3f}s  full reread={full:8.3f}s")
+
+
+# Import time each entry script may cost before its window can open
+STARTUP_BUDGET = 0.100
+STARTUP_MODULES = ("app", "appl", "Test", "test2", "test3", "test4", "res")
+
+
+def bench_startup(sizes):
+    # sizes are repeat counts: each module is imported in a fresh interpreter,
+    # so nothing is already cached in sys.modules; the best run is kept
+    baseline = min(import_time("pass") for _ in range(3))
+    for repeats in sizes:
+        for module in STARTUP_MODULES:
+            elapsed = min(import_time(f"import {module}") for _ in range(repeats)) - baseline
+            record("startup", {"module": module, "repeats": repeats},
+                   {"import_s": elapsed, "within_budget": elapsed <= STARTUP_BUDGET})
+
+
+def import_time(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - start
+
+
+# -----------------------------------------------------
+# Calculator apps, driven without a user
+# -----------------------------------------------------
+def tk_root():
+    # Tk needs a display; on a headless machine run under xvfb-run. Without
+    # one, the benchmarks that can use widget stand-ins still run.
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    return root
+
+
+@contextlib.contextmanager
+def no_dialogs(open_file=None):
+    # Message boxes return at once and are collected; the file dialog answers open_file
+    saved = [(module, name, getattr(module, name)) for module, name in
+             ((messagebox, "showinfo"), (messagebox, "showwarning"), (messagebox, "showerror"),
+              (filedialog, "askopenfilename"))]
+    shown = []
+    for module, name, _ in saved[:3]:
+        setattr(module, name, lambda title, message, **kwargs: shown.append((title, message)))
+    filedialog.askopenfilename = lambda **kwargs: open_file
+    try:
+        yield shown
+    finally:
+        for module, name, func in saved:
+            setattr(module, name, func)
+
+
+class ReportStub:
+    # Stands in for the VirtualText result box: the lines it would render are joined
+    def set_lines(self, lines):
+        self.lines = lines
+        "".join(lines[0:20] if len(lines) > VIRTUAL_THRESHOLD else lines)
+
+
+def calculator_app(root):
+    # test2's calculator; without a display only the state calculate_totals
+    # uses is set, with its export button already shown
+    if root is not None:
+        return test2.GasCalculator(root)
+    app = test2.GasCalculator.__new__(test2.GasCalculator)
+    app.root = None
+    app.export_button = True
+    return app
+
+
+def excel_app(root, state_folder):
+    # test3's window, without the column mapping and the user's caches
+    app = test3.GasAppExcel.__new__(test3.GasAppExcel)
+    app.root = root
+    app.mapping = None
+    app.importer = IncrementalImporter(state_folder)
+    app.results = VirtualText(root) if root is not None else ReportStub()
+    return app
+
+
+def bench_pumptable(sizes):
+    # sizes are pump counts, 20 per station, typed into test2's entry screens
+    root = tk_root()
+    if root is None:
+        print("pumptable  skipped: no display (run under xvfb-run)")
+        return
+    with no_dialogs():
+        for n_pumps in sizes:
+            app = calculator_app(root)
+            app.num_stations_entry.insert(0, str(max(1, n_pumps // 20)))
+            app.create_station_entries()
+            for essence_entry, gasoil_entry in app.pump_inputs:
+                essence_entry.insert(0, "10")
+                gasoil_entry.insert(0, "10")
+
+            start = time.perf_counter()
+            app.create_pump_table()
+            root.update_idletasks()
+            elapsed = time.perf_counter() - start
+            record("pumptable", {"pumps": len(app.pump_inputs) * 20}, {"time_s": elapsed})
+            for widget in root.winfo_children():
+                widget.destroy()
+    root.destroy()
+
+
+def bench_calculate(sizes):
+    # sizes are station counts, each with 20 pumps
+    root = tk_root()
+    for n_stations in sizes:
+        app = calculator_app(root)
+        app.stations = filled_stations(n_stations, 20)
+        with no_dialogs() as shown:
+            _, elapsed, peak = measure(app.calculate_totals)
+        if shown[0][0] != "Totaux":
+            raise RuntimeError(shown[0][1])
+        record("calculate", {"stations": n_stations, "pumps": n_stations * 20, "display": root is not None},
+               {"time_s": elapsed, "peak_mb": peak / 1e6})
+    if root is not None:
+        root.destroy()
+
+
+def bench_excel(sizes):
+    # test3's import: read, validate, aggregate and show the report
+    root = tk_root()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            file_path = os.path.join(tmp, f"meters_{n_rows}.xlsx")
+            generate_workbook(file_path, n_rows)
+            app = excel_app(root, os.path.join(tmp, f"state_{n_rows}"))
+            with no_dialogs(file_path) as shown:
+                _, elapsed, peak = measure(app.import_excel)
+            if shown:
+                raise RuntimeError(shown[0][1])
+            record("excel", {"rows": n_rows, "display": root is not None},
+                   {"time_s": elapsed, "peak_mb": peak / 1e6, "report_lines": len(app.results.lines)})
+    if root is not None:
+        root.destroy()
+
+
+def run_job(job):
+    # As test2 does, without the 100 ms between polls
+    job.start()
+    while not job.done:
+        time.sleep(0.005)
+    if job.error:
+        raise job.error
+
+
+def bench_exportjob(sizes):
+    # test2's export against detail-row count, in every format it offers
+    results = [[f"Station {s + 1}", 1000.0, 13500.0, 800.0, 9680.0] for s in range(200)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            detailed = list(detail_rows(n_rows))
+            for fmt, exporter in EXPORTERS.items():
+                job = ExportJob(report_filename(tmp, f"{n_rows}", fmt), results, detailed, exporter)
+                _, elapsed, peak = measure(run_job, job)
+                record("exportjob", {"format": fmt, "rows": n_rows}, {"time_s": elapsed, "peak_mb": peak / 1e6})
+
+
+def bench_trace(sizes):
+    # sizes are stage counts: what an instrumented stage costs with tracing
+    # off (the default) and on
+    for n_stages in sizes:
+        timings = {}
+        for mode in ("off", "on"):
+            if mode == "on":
+                gas_trace.enable()
+            start = time.perf_counter()
+            with contextlib.redirect_stderr(io.StringIO()):
+                for _ in range(n_stages):
+                    with gas_trace.stage("bench") as info:
+                        info["rows"] = 1
+            timings[f"{mode}_us"] = (time.perf_counter() - start) / n_stages * 1e6
+        gas_trace.disable()
+        record("trace", {"stages": n_stages}, timings)
+
+
+def money_stations(n_stations, seed=0):
+    # Readings and prices typed as on the meters and price boards
+    rnd = random.Random(seed)
+    stations = build_stations([(10, 10)] * n_stations)
+    for station in stations:
+        station.price_essence_text = f"{rnd.uniform(12, 15):.2f}"
+        station.price_gasoil_text = f"{rnd.uniform(10, 13):.3f}"
+        for pump in station.pumps:
+            initial = rnd.uniform(0, 100000)
+            pump.initial_text = f"{initial:.2f}"
+            pump.final_text = f"{initial + rnd.uniform(0, 500):.2f}"
+    return stations
+
+
+def decimal_revenue(stations):
+    # Reference Essence and Gasoil revenue, worked out in Decimal from the
+    # typed text and rounded once
+    totals = [Decimal(0), Decimal(0)]
+    for station in stations:
+        for pump in station.pumps:
+            gasoil = pump.category != "Essence"
+            price = station.price_gasoil_text if gasoil else station.price_essence_text
+            totals[gasoil] += (Decimal(pump.final_text) - Decimal(pump.initial_text)) * Decimal(price)
+    return [float(total.quantize(Decimal("0.01"), ROUND_HALF_UP)) for total in totals]
+
+
+def bench_money(sizes):
+    # sizes are station counts, each with 20 pumps: float sums against the
+    # exact centilitre x millime path, in the model and as columns; drift is
+    # how far the grand revenues are from the Decimal reference, in DH
+    for n_stations in sizes:
+        stations = money_stations(n_stations)
+        expected = decimal_revenue(stations)
+        pumps = [pump for station in stations for pump in station.pumps]
+        columns = {
+            "station": np.array([pump.station.number for pump in pumps], dtype=np.int64),
+            "pump": np.array([pump.number for pump in pumps], dtype=np.int64),
+            "initial": np.array([pump.initial for pump in pumps]),
+            "final": np.array([pump.final for pump in pumps]),
+            "category": np.array([pump.category for pump in pumps]),
+            "price": np.array([pump_price(pump) for pump in pumps], dtype=np.float64),
+        }
+
+        for path, run in (("model", lambda exact: compute_totals(stations, exact)[2]),
+                          ("columns", lambda exact: aggregate_categories(columns, exact=exact)[1])):
+            metrics = {}
+            for mode, exact in (("float", False), ("exact", True)):
+                best = None
+                for _ in range(3):
+                    start = time.perf_counter()
+                    grand = run(exact)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                metrics[f"{mode}_s"] = best
+                metrics[f"{mode}_drift"] = abs(grand[1] - expected[0]) + abs(grand[3] - expected[1])
+            record("money", {"path": path, "stations": n_stations, "pumps": n_stations * 20}, metrics)
+
+
+BENCHMARKS = {
+    "import": bench_import,
+    "aggregate": bench_aggregate,
+    "report": bench_report,
+    "totals": bench_totals,
+    "categories": bench_categories,
+    "batch": bench_batch,
+    "export": bench_export,
+    "formats": bench_formats,
+    "validate": bench_validate,
+    "sheets": bench_sheets,
+    "cache": bench_cache,
+    "store": bench_store,
+    "db": bench_db,
+    "reconcile": bench_reconcile,
+    "incremental": bench_incremental,
+    "startup": bench_startup,
+    "pumptable": bench_pumptable,
+    "calculate": bench_calculate,
+    "excel": bench_excel,
+    "exportjob": bench_exportjob,
+    "trace": bench_trace,
+    "money": bench_money,
+}
+
+# Sizes used when --sizes is not given, in each benchmark's own unit (see the
+# comment at the top of each one); rows unless noted
+ROWS = [10000, 50000, 200000]
+DEFAULT_SIZES = {
+    "import": ROWS,
+    "aggregate": ROWS,
+    "report": ROWS,
+    "totals": [100, 1000, 5000],  # stations
+    "categories": [100, 1000, 5000],  # stations
+    "batch": [4, 16],  # workbooks
+    "export": ROWS,
+    "formats": ROWS,
+    "validate": ROWS,
+    "sheets": ROWS,
+    "cache": ROWS,
+    "store": ROWS,
+    "db": [30, 365],  # days
+    "reconcile": [30, 365],  # days
+    "incremental": ROWS,
+    "startup": [5],  # repeats
+    "pumptable": [100, 1000, 4000],  # pumps
+    "calculate": [10, 100, 1000],  # stations
+    "excel": ROWS,
+    "exportjob": ROWS,
+    "trace": [10000, 100000],  # stages
+    "money": [100, 1000, 5000],  # stations
+}
+
+# What "suite" runs, with sizes in each benchmark's own unit
+SUITE = {
+    "pumptable": [100, 1000, 4000],
+    "calculate": [10, 100, 1000],
+    "excel": [10000, 50000, 200000],
+    "exportjob": [10000, 50000, 200000],
+    "startup": [5],
+}
+
+
+def save_results(file_path):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": RESULTS,
+        }, f, indent=1)
+
+
+def compare_results(file_path):
+    # Matches results by benchmark and parameters; returns how many costs
+    # grew by more than REGRESSION_RATIO
+    with open(file_path, encoding="utf-8") as f:
+        earlier = json.load(f)
+    baseline = {(result["benchmark"], json.dumps(result["params"], sort_keys=True)): result["metrics"]
+                for result in earlier["results"]}
+
+    regressions = 0
+    for result in RESULTS:
+        params = json.dumps(result["params"], sort_keys=True)
+        old = baseline.get((result["benchmark"], params))
+        if old is None:
+            continue
+        for name, value in result["metrics"].items():
+            if not name.endswith(("_s", "_mb")) or not old.get(name):
+                continue
+            change = value / old[name]
+            flag = ""
+            if change > REGRESSION_RATIO:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"compare  {result['benchmark']}  {params}  {name}: {old[name]:.4f} -> {value:.4f}  ({change:.2f}x){flag}")
+    print(f"compare  against {earlier.get('commit') or file_path}: {regressions} regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gas station calculator benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["suite"])
+    parser.add_argument("--sizes", type=int, nargs="+", help="default: DEFAULT_SIZES of the benchmark; ignored by suite")
+    parser.add_argument("--json", help="save the recorded results to this file")
+    parser.add_argument("--compare", help="results file of an earlier version; exits 1 on a regression")
+    args = parser.parse_args()
+    if args.benchmark == "suite":
+        for name, sizes in SUITE.items():
+            BENCHMARKS[name](sizes)
+    else:
+        BENCHMARKS[args.benchmark](args.sizes or DEFAULT_SIZES[args.benchmark])
+
+    if args.json:
+        save_results(args.json)
+    if args.compare and compare_results(args.compare):
+        sys.exit(1)
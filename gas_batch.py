@@ -0,0 +1,191 @@
+# Headless batch mode: computes station reports for a directory of meter-log
+# workbooks (or CSV/Parquet dumps) without Tk.
+#
+#   python gas_batch.py INPUT_DIR [--output OUTPUT_DIR] [--workers N] [--summary FILE] [--format FMT] [--cache]
+#                       [--columns MAPPING.json]
+#
+# With --workers the files are parsed in a process pool; per-station totals
+# are merged in input order, so the summary does not depend on which worker
+# finished first.
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from gas_cache import ParseCache
+from gas_engine import (read_columns, aggregate_columns, aggregate_categories, category_details, load_column_mapping,
+                        READERS)
+from gas_export import (report_folder, save_report, save_error_report, error_report_filename, EXPORTERS,
+                        STATION_HEADER, DETAIL_HEADER)
+
+LITERS_STATION_HEADER = ["Station", "Litres"]
+LITERS_DETAIL_HEADER = ["Station", "Pompe", "Initial", "Final", "Litres"]
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Batch reports get their own folder and prefix: a Gas_Station_Report_<date>
+# file is the operator's saved report for that day, and gas_reconcile loads
+# it into the archive
+BATCH_PREFIX = "Gas_Batch_Report_"
+
+
+def batch_folder():
+    return os.path.join(report_folder(), "batch")
+
+
+def find_inputs(input_dir):
+    paths = []
+    for name in sorted(os.listdir(input_dir)):
+        # Skip our own outputs and Excel lock files
+        if name.startswith(("Gas_Station_Report_", BATCH_PREFIX, "~$")):
+            continue
+        if os.path.splitext(name)[1].lower() in READERS:
+            paths.append(os.path.join(input_dir, name))
+    return paths
+
+
+def report_date(file_path):
+    # Date in the file name wins, otherwise the day the file was last written
+    match = DATE_PATTERN.search(os.path.basename(file_path))
+    if match:
+        return match.group(0)
+    return datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y-%m-%d")
+
+
+def process_file(file_path, use_cache=False, mapping=None):
+    if use_cache:
+        columns = ParseCache().read_columns(file_path, mapping=mapping)
+    else:
+        columns = read_columns(file_path, mapping)
+    pumped, station_totals, grand_total = aggregate_columns(columns)
+
+    if "category" in columns and "price" in columns:
+        # Same layout as the GUI report: litres and revenue per category
+        try:
+            results, grand = aggregate_categories(columns, exact=True)
+        except ValueError as e:
+            # Missing price, or a reading finer than the exact path counts: litres only
+            print(f"{file_path}: revenue not computed: {e}", file=sys.stderr)
+        else:
+            results.append(["Total", *grand])
+            headers = (STATION_HEADER, DETAIL_HEADER)
+            return results, category_details(columns, exact=True), headers, station_totals, grand_total, columns["errors"]
+
+    results = station_results(station_totals, grand_total)
+    # Generator, so the detail rows are streamed into the write-only export
+    detailed_results = (
+        [f"Station {station}", pump, initial, final, liters]
+        for station, pump, initial, final, liters in zip(
+            columns["station"].tolist(),
+            columns["pump"].tolist(),
+            columns["initial"].tolist(),
+            columns["final"].tolist(),
+            pumped.tolist(),
+        )
+    )
+    headers = (LITERS_STATION_HEADER, LITERS_DETAIL_HEADER)
+    return results, detailed_results, headers, station_totals, grand_total, columns["errors"]
+
+
+def station_results(station_totals, grand_total):
+    results = [[f"Station {station}", total] for station, total in station_totals.items()]
+    results.append(["Total", grand_total])
+    return results
+
+
+def output_filename(file_path, output_dir, used, fmt="xlsx"):
+    filename = os.path.join(output_dir, f"{BATCH_PREFIX}{report_date(file_path)}.{fmt}")
+    if filename in used:
+        # Several inputs for the same day: keep them apart by source name
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        filename = os.path.splitext(filename)[0] + f"_{stem}.{fmt}"
+    used.add(filename)
+    return filename
+
+
+def process_task(task):
+    # Runs in a worker process: errors are returned as text so one bad file
+    # never aborts the run
+    file_path, filename, fmt, use_cache, mapping = task
+    try:
+        results, detailed_results, headers, station_totals, grand_total, errors = process_file(
+            file_path, use_cache, mapping
+        )
+        EXPORTERS[fmt](filename, results, detailed_results, *headers)
+        if len(errors):
+            save_error_report(filename, errors)
+        return station_totals, grand_total, len(errors), None
+    except Exception as e:
+        return None, None, 0, f"{type(e).__name__}: {e}"
+
+
+def run_batch(paths, output_dir, workers=1, fmt="xlsx", use_cache=False, mapping=None):
+    used = set()
+    tasks = [
+        (file_path, output_filename(file_path, output_dir, used, fmt), fmt, use_cache, mapping) for file_path in paths
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            outcomes = executor.map(process_task, tasks, chunksize=chunksize)
+            return merge_outcomes(tasks, outcomes)
+    return merge_outcomes(tasks, map(process_task, tasks))
+
+
+def merge_outcomes(tasks, outcomes):
+    failures = []
+    merged = {}
+    file_totals = []
+    grand_total = 0
+
+    # map() yields in task order, whatever order the workers finish in
+    for (file_path, filename, *_), (station_totals, file_total, problems, error) in zip(tasks, outcomes):
+        if error:
+            failures.append((file_path, error))
+            print(f"{file_path}: {error}", file=sys.stderr)
+            continue
+        for station, total in station_totals.items():
+            merged[station] = merged.get(station, 0) + total
+        grand_total += file_total
+        file_totals.append([os.path.basename(file_path), file_total])
+        print(f"{file_path} -> {filename}")
+        if problems:
+            print(f"{file_path}: {problems} problems, listed in {error_report_filename(filename)}", file=sys.stderr)
+
+    merged = dict(sorted(merged.items()))
+    return failures, merged, grand_total, file_totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute gas station reports from meter-log workbooks")
+    parser.add_argument("input_dir", help="directory holding the input workbooks")
+    parser.add_argument("--output", help="directory for the reports (default: ~/Documents/GasReports/batch)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0: one per CPU)")
+    parser.add_argument("--summary", help="also write the merged per-station totals to this workbook")
+    parser.add_argument("--cache", action="store_true", help="reuse parsed workbooks from the parse cache")
+    parser.add_argument("--columns", help="JSON file of extra header names per column (see COLUMN_ALIASES)")
+    parser.add_argument("--format", default="xlsx", choices=sorted(EXPORTERS), help="report format (default: xlsx)")
+    args = parser.parse_args(argv)
+
+    output_dir = args.output or batch_folder()
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = find_inputs(args.input_dir)
+    workers = args.workers or os.cpu_count()
+    mapping = load_column_mapping(args.columns) if args.columns else None
+    failures, station_totals, grand_total, file_totals = run_batch(
+        paths, output_dir, workers, args.format, args.cache, mapping
+    )
+
+    if args.summary:
+        results = station_results(station_totals, grand_total)
+        save_report(args.summary, results, file_totals, LITERS_STATION_HEADER, ["Fichier", "Litres"])
+    print(f"{len(paths) - len(failures)}/{len(paths)} workbooks processed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# On-disk cache of parsed meter logs. Entries are the station/pump/initial/final
+# arrays and the validation errors saved as .npz, named by the SHA-256 of the
+# source file. index.json maps each source path to its size, mtime and hash, so
+# an unchanged file is found with a single stat and never reaches openpyxl again.
+# Several processes may share the folder (gas_batch --workers N --cache):
+# index.json is only read and written under index.lock.
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from gas_engine import read_columns
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_VERSION = 7
+
+# A lock file older than this was left by a process that died holding it
+STALE_LOCK_SECONDS = 60
+
+
+def cache_folder():
+    return os.path.join(os.path.expanduser("~"), "Documents", "GasReports", "cache")
+
+
+@contextlib.contextmanager
+def index_lock(lock_path):
+    # Exclusive across processes: whoever creates the lock file holds it
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = folder or cache_folder()
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.folder, "index.json")
+        self.lock_path = os.path.join(self.folder, "index.lock")
+        os.makedirs(self.folder, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {"version": CACHE_VERSION, "files": {}, "entries": {}}
+        if index.get("version") != CACHE_VERSION:
+            return {"version": CACHE_VERSION, "files": {}, "entries": {}}
+        return index
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _entry_path(self, digest):
+        return os.path.join(self.folder, f"{digest}.npz")
+
+    def _load_entry(self, digest):
+        try:
+            with np.load(self._entry_path(digest), allow_pickle=False) as data:
+                return {key: data[key] for key in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def read_columns(self, file_path, reader=read_columns, mapping=None):
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+
+        # Fast path: same size and mtime as last time, no hashing needed
+        known = self.index["files"].get(path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            digest = known["sha256"]
+        else:
+            digest = file_hash(path)
+
+        # Entries are keyed by the file, the cache version (an entry in an old
+        # layout is never loaded, even without a current index) and the column
+        # mapping, which reads the same file differently
+        key = hashlib.sha256(f"{CACHE_VERSION}:{digest}:{json.dumps(mapping, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+        # Entries are replaced atomically, so one can be loaded without the lock;
+        # it may also have been written by another process since our index was read
+        columns = self._load_entry(key)
+        parsed = columns is None
+        if parsed:
+            columns = reader(path) if mapping is None else reader(path, mapping=mapping)
+
+        with index_lock(self.lock_path):
+            # Changes go into the index as it is on disk now, not as it was
+            # when this process last read it
+            self.index = self._load_index()
+            entries = self.index["entries"]
+            if parsed or key not in entries:
+                self._store(key, columns)
+            self.index["files"][path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "entry": key}
+            entries[key]["last_used"] = time.time()
+            self._evict()
+            self._save_index()
+        return columns
+
+    def _store(self, digest, columns):
+        entry_path = self._entry_path(digest)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, entry_path)
+        self.index["entries"][digest] = {"bytes": os.path.getsize(entry_path), "last_used": time.time()}
+
+    def _evict(self):
+        # Least recently used entries go first until the cache fits max_bytes
+        entries = self.index["entries"]
+        total = sum(entry["bytes"] for entry in entries.values())
+        for digest in sorted(entries, key=lambda d: entries[d]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(digest)["bytes"]
+            try:
+                os.remove(self._entry_path(digest))
+            except OSError:
+                pass
+
+        live = set(entries)
+        self.index["files"] = {path: info for path, info in self.index["files"].items() if info["entry"] in live}
+
+        # Entries are only stored under the lock, so one missing from the index is an orphan
+        for name in os.listdir(self.folder):
+            if name.endswith(".npz") and name[:-len(".npz")] not in live:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        with index_lock(self.lock_path):
+            self.index = {"version": CACHE_VERSION, "files": {}, "entries": {}}
+            self._evict()
+            self._save_index()
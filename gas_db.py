@@ -0,0 +1,98 @@
+# SQLite copy of the per-pump rows written to the "Pompes Détails" sheet, for
+# totals over any period without reopening old reports.
+#
+#   python gas_db.py --from 2025-03-01 --to 2025-04-01 [--by station|category]
+import argparse
+import os
+import sqlite3
+import sys
+
+from gas_export import iter_detail_records
+
+# The indexes carry liters too, so period totals are answered from the index alone
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    date TEXT NOT NULL,
+    station INTEGER NOT NULL,
+    pump INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    initial REAL NOT NULL,
+    final REAL NOT NULL,
+    liters REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_station_date ON readings (station, date, liters);
+CREATE INDEX IF NOT EXISTS readings_category_date ON readings (category, date, liters);
+"""
+
+
+def database_path():
+    return os.path.join(os.path.expanduser("~"), "Documents", "GasReports", "readings.db")
+
+
+def connect(path=None):
+    path = path or database_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_day(conn, date, detailed_results):
+    # Same rule as the xlsx report: a new save for a day replaces the old one
+    with conn:
+        conn.execute("DELETE FROM readings WHERE date = ?", (date,))
+        conn.executemany(
+            "INSERT INTO readings (date, station, pump, category, initial, final, liters) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((date, *record) for record in iter_detail_records(detailed_results)),
+        )
+
+
+def _period(start, end):
+    # [start, end) on YYYY-MM-DD dates; either bound may be omitted
+    return start or "0000-00-00", end or "9999-99-99"
+
+
+def totals_by_station(conn, start=None, end=None):
+    return dict(conn.execute(
+        "SELECT station, SUM(liters) FROM readings WHERE date >= ? AND date < ? GROUP BY station ORDER BY station",
+        _period(start, end),
+    ))
+
+
+def totals_by_category(conn, start=None, end=None):
+    return dict(conn.execute(
+        "SELECT category, SUM(liters) FROM readings WHERE date >= ? AND date < ? GROUP BY category ORDER BY category",
+        _period(start, end),
+    ))
+
+
+def station_history(conn, station, start=None, end=None):
+    return conn.execute(
+        "SELECT date, category, SUM(liters) FROM readings"
+        " WHERE station = ? AND date >= ? AND date < ? GROUP BY date, category ORDER BY date, category",
+        (station, *_period(start, end)),
+    ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Totals from the readings database")
+    parser.add_argument("--db", help="database file (default: ~/Documents/GasReports/readings.db)")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="day after the last one, YYYY-MM-DD")
+    parser.add_argument("--by", choices=["station", "category"], default="station")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    if args.by == "station":
+        for station, liters in totals_by_station(conn, args.start, args.end).items():
+            print(f"Station {station}: {liters} L")
+    else:
+        for category, liters in totals_by_category(conn, args.start, args.end).items():
+            print(f"{category}: {liters} L")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
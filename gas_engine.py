@@ -0,0 +1,762 @@
+import csv
+import importlib.util
+import io
+import json
+import math
+import os
+import re
+import unicodedata
+import zipfile
+from itertools import groupby, islice
+from xml.etree import ElementTree
+
+import numpy as np
+
+from gas_model import LITER_PLACES, PRICE_PLACES, round_totals
+
+# openpyxl and pyarrow are imported where they are used: together they take
+# longer to load than the rest of the GUI, and most sessions need at most one
+HAVE_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Station ids below this are summed with a direct bincount instead of a sort
+DENSE_STATION_LIMIT = 1_000_000
+
+# Rows converted and validated per block by the Excel and csv-module readers
+CHUNK_ROWS = 100_000
+
+KEYS = ("station", "pump", "initial", "final")
+
+# Read when the sheet has a header for them; category feeds the
+# Essence/Gasoil split, price is the price per litre of the row
+OPTIONAL_KEYS = ("category", "price")
+# Columns validate_columns may return besides KEYS: the optional ones, and
+# "wrap", the meter capacity to add back on rows that rolled over
+DERIVED_KEYS = OPTIONAL_KEYS + ("wrap",)
+
+# Header names recognised for each column, compared after normalize_header.
+# Sheets whose header matches none of the required columns are read
+# positionally: station, pump, initial, final.
+COLUMN_ALIASES = {
+    "station": ("station", "station no", "n station", "no station", "numero station", "station id"),
+    "pump": ("pump", "pompe", "pump no", "pompe no", "n pompe", "no pompe", "numero pompe"),
+    "initial": ("initial", "index initial", "compteur initial", "releve initial", "debut", "initial reading"),
+    "final": ("final", "index final", "compteur final", "releve final", "fin", "final reading"),
+    "category": ("categorie", "category", "carburant", "produit", "fuel"),
+    "price": ("prix", "prix par litre", "prix par litre dh", "prix dh", "prix unitaire", "price", "unit price"),
+    # One price column per category, as in the calculator's table; only used
+    # when there is no single price column
+    "price_essence": ("prix par litre essence dh", "prix par litre essence", "prix essence dh", "prix essence"),
+    "price_gasoil": ("prix par litre gasoil dh", "prix par litre gasoil", "prix gasoil dh", "prix gasoil"),
+}
+
+# A meter that passes its last digit restarts at zero. A reading that went
+# backwards is reported as a rollover when the wrapped volume is under this
+# share of the meter's capacity, otherwise as a negative volume
+ROLLOVER_SHARE = 0.01
+
+# How far from a whole number of centilitres (or millimes) a value may be and
+# still count as float noise: a third decimal is at least 0.1 cl away
+FIXED_TOLERANCE = 1e-3
+
+# One record per problem cell: source (file and sheet, when several are
+# imported together), sheet row number, column and reason. kept is set for
+# rows that are flagged but still counted (meter rollovers); the others are
+# left out of the totals.
+ERROR_DTYPE = np.dtype([
+    ("source", "U64"), ("row", np.int64), ("column", "U8"), ("reason", "U64"), ("kept", np.bool_),
+])
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xltx", ".xltm")
+
+# Problems listed at the end of a report; the rest are only counted
+MAX_LISTED_ERRORS = 100
+
+NUMBER_TEXT = re.compile(r"\s*[+-]?(\d+([.,]\d*)?|[.,]\d+)([eE][+-]?\d+)?\s*")
+
+
+# -----------------------------------------------------
+# Excel reading (streaming, read-only)
+# -----------------------------------------------------
+def read_sheet_columns(ws, mapping=None):
+    header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    indexes = resolve_columns(header, mapping)
+
+    # Rows come padded to max_col, so each block is transposed once and the
+    # columns picked by index
+    rows = ws.iter_rows(min_row=2, max_col=max(indexes.values()) + 1, values_only=True)
+    blocks = []
+    first_row = 2
+    while True:
+        chunk = list(islice(rows, CHUNK_ROWS))
+        if not chunk:
+            break
+        cells = list(zip(*chunk))
+        blocks.append(validate_columns({key: cells[index] for key, index in indexes.items()}, first_row))
+        first_row += len(chunk)
+    return concat_blocks(blocks)
+
+
+def read_excel_columns(file_path, sheet=None, mapping=None):
+    # sheet is a sheet name; None reads the active sheet
+    return read_excel_sheets(file_path, [sheet], mapping)[0]
+
+
+def read_excel_sheets(file_path, sheets, mapping=None):
+    import openpyxl
+
+    # Several sheets from one open of the workbook, one block per sheet
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return [read_sheet_columns(wb.active if sheet is None else wb[sheet], mapping) for sheet in sheets]
+    finally:
+        wb.close()
+
+
+# -----------------------------------------------------
+# Header detection
+# -----------------------------------------------------
+def normalize_header(name):
+    # "N° Pompe", "n pompe " and "N. POMPE" all become "n pompe"
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def load_column_mapping(file_path):
+    # COLUMN_ALIASES extended with the header names of a JSON file such as
+    # {"station": ["Code station"], "final": ["Index fin de journée"]}
+    with open(file_path, encoding="utf-8") as f:
+        extra = json.load(f)
+    unknown = set(extra) - set(COLUMN_ALIASES)
+    if unknown:
+        raise ValueError(f"Unknown columns in {file_path}: {', '.join(sorted(unknown))}")
+    return {key: aliases + tuple(extra.get(key, ())) for key, aliases in COLUMN_ALIASES.items()}
+
+
+def resolve_columns(header, mapping=None):
+    # Column index of each key, worked out once per sheet from its header row
+    aliases = {}
+    for key, names in (mapping or COLUMN_ALIASES).items():
+        for name in names:
+            aliases.setdefault(normalize_header(name), key)
+
+    indexes = {}
+    for index, name in enumerate(header):
+        key = aliases.get(normalize_header(name)) if name is not None else None
+        if key is not None and key not in indexes:
+            indexes[key] = index
+
+    missing = [key for key in KEYS if key not in indexes]
+    if len(missing) == len(KEYS):
+        # No header we know: the historical layout
+        return {key: index for index, key in enumerate(KEYS)}
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return indexes
+
+
+# -----------------------------------------------------
+# Validation (whole columns at a time)
+# -----------------------------------------------------
+def to_float_column(values):
+    # Numbers and numeric text convert in one call and blanks become NaN.
+    # Only a column that fails is scanned value by value, without raising.
+    # Infinities ("inf" text, or from the CSV reader) are not numbers either.
+    try:
+        numbers = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        numbers = None
+    if numbers is not None:
+        infinite = np.isinf(numbers)
+        if not infinite.any():
+            return numbers, None
+        return np.where(infinite, np.nan, numbers), infinite
+
+    numbers = np.full(len(values), np.nan)
+    bad = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not math.isinf(value):
+            numbers[i] = value
+        elif isinstance(value, str) and NUMBER_TEXT.fullmatch(value):
+            # Decimal comma from French locales
+            numbers[i] = float(value.replace(",", "."))
+        elif not isinstance(value, str) or value.strip():
+            bad[i] = True
+    return numbers, bad
+
+
+def validate_columns(raw, first_row=2, extra_checks=()):
+    # raw maps each of KEYS to the cell values of one block of rows, the first
+    # being sheet row first_row. Returns the valid rows as typed columns and
+    # the problems found as an "errors" record array.
+    # Each check is (column, mask, reason, kept) and is only kept when it
+    # flags something, so a clean block costs a handful of vectorised passes.
+    # extra_checks are (column, mask, reason) found by the reader.
+    numbers = {}
+    blanks = {}
+    checks = [(key, mask, reason, False) for key, mask, reason in extra_checks]
+    for key in KEYS:
+        values, bad = to_float_column(raw[key])
+        numbers[key] = values
+        blank = np.isnan(values)
+        if bad is not None:
+            blank &= ~bad
+            checks.append((key, bad, "not a number", False))
+        if blank.any():
+            blanks[key] = blank
+            checks.append((key, blank, "empty cell", False))
+
+    for key in ("station", "pump"):
+        values = numbers[key]
+        # NaN compares false: blanks and non-numbers are reported above
+        fraction = np.abs(values - np.trunc(values)) > 0
+        if fraction.any():
+            checks.append((key, fraction, "not a whole number", False))
+
+    if "category" in raw:
+        numbers["category"] = to_category_column(raw["category"])
+    prices = None
+    if "price" in raw:
+        prices, bad = to_float_column(raw["price"])
+    elif "category" in numbers and ("price_essence" in raw or "price_gasoil" in raw):
+        prices, bad = category_prices(raw, numbers["category"])
+    if prices is not None:
+        if bad is not None:
+            checks.append(("price", bad, "not a number", False))
+        numbers["price"] = prices
+
+    initial, final = numbers["initial"], numbers["final"]
+    backwards = final < initial
+    if backwards.any():
+        capacity = 10 ** (np.floor(np.log10(np.maximum(initial, 1))) + 1)
+        wrapped = capacity - initial + final
+        rollover = backwards & (final >= 0) & (wrapped < capacity * ROLLOVER_SHARE)
+        checks.append(("final", backwards & ~rollover, "final reading below initial", False))
+        if rollover.any():
+            # Real sales: counted with the meter capacity added back, and flagged
+            reasons = np.array([f"meter rollover (about {liters:g} liters)" for liters in wrapped[rollover].tolist()])
+            checks.append(("final", rollover, reasons, True))
+            numbers["wrap"] = np.where(rollover, capacity, 0.0)
+
+    # Rows left completely blank are skipped without a report
+    empty = None
+    if len(blanks) == len(KEYS):
+        empty = blanks["station"] & blanks["pump"] & blanks["initial"] & blanks["final"]
+        if not empty.any():
+            empty = None
+
+    invalid = empty
+    parts = []
+    for key, mask, reason, kept in checks:
+        if empty is not None:
+            mask = mask & ~empty
+        if not mask.any():
+            continue
+        if not kept:
+            invalid = mask if invalid is None else invalid | mask
+        rows = np.flatnonzero(mask)
+        records = np.zeros(len(rows), dtype=ERROR_DTYPE)
+        records["row"] = rows + first_row
+        records["column"] = key
+        records["kept"] = kept
+        # Either one reason for all, or one per flagged row (rollovers have
+        # both readings, so they are never in the blank rows filtered out)
+        records["reason"] = reason
+        parts.append(records)
+
+    if parts:
+        errors = np.concatenate(parts)
+        errors = errors[np.argsort(errors["row"], kind="stable")]
+    else:
+        errors = np.empty(0, dtype=ERROR_DTYPE)
+
+    if invalid is not None:
+        keep = ~invalid
+        numbers = {key: values[keep] for key, values in numbers.items()}
+
+    columns = {
+        "station": numbers["station"].astype(np.int64),
+        "pump": numbers["pump"].astype(np.int64),
+        "initial": numbers["initial"],
+        "final": numbers["final"],
+    }
+    for key in DERIVED_KEYS:
+        if key in numbers:
+            columns[key] = numbers[key]
+    columns["errors"] = errors
+    return columns
+
+
+def to_category_column(values):
+    # " ESSENCE" and "essence" both become "Essence"; blanks stay empty
+    column = np.array(values, dtype=object)
+    column[np.equal(column, None)] = ""
+    return np.char.capitalize(np.char.strip(column.astype(str)))
+
+
+def category_prices(raw, category):
+    # Each row takes the price column of its own category; anything that is
+    # not Essence counts as Gasoil, and a category without a column is blank
+    prices = np.full(len(category), np.nan)
+    bad = np.zeros(len(category), dtype=bool)
+    essence = category == CATEGORIES[0]
+    for key, rows in (("price_essence", essence), ("price_gasoil", ~essence)):
+        if key in raw:
+            values, wrong = to_float_column(raw[key])
+            prices[rows] = values[rows]
+            if wrong is not None:
+                bad |= wrong & rows
+    return prices, bad if bad.any() else None
+
+
+def missing_column(key, length):
+    if key == "category":
+        return np.full(length, "")
+    if key == "wrap":
+        return np.zeros(length)
+    return np.full(length, np.nan)
+
+
+def concat_blocks(blocks):
+    if not blocks:
+        return validate_columns({key: () for key in KEYS})
+    if len(blocks) == 1:
+        return blocks[0]
+    columns = {key: np.concatenate([block[key] for block in blocks]) for key in KEYS}
+    # Optional columns are kept when any block has them, blank elsewhere
+    for key in DERIVED_KEYS:
+        if any(key in block for block in blocks):
+            columns[key] = np.concatenate([
+                block[key] if key in block else missing_column(key, len(block["station"])) for block in blocks
+            ])
+    columns["errors"] = np.concatenate([block["errors"] for block in blocks])
+    return columns
+
+
+def error_lines(errors):
+    lines = [
+        f"{source + ', ' if source else ''}Row {row}, {column}: {reason}{' (counted)' if kept else ''}\n"
+        for source, row, column, reason, kept in errors[:MAX_LISTED_ERRORS].tolist()
+    ]
+    if len(errors) > MAX_LISTED_ERRORS:
+        lines.append(f"... and {len(errors) - MAX_LISTED_ERRORS} more\n")
+    return lines
+
+
+# -----------------------------------------------------
+# CSV / Parquet reading
+# -----------------------------------------------------
+def csv_delimiter(header):
+    return ";" if header.count(b";") > header.count(b",") else ","
+
+
+def table_to_columns(table, first_row=2, mapping=None):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Same rules as the Excel path: columns found from the header, validated as whole columns
+    indexes = resolve_columns(table.column_names, mapping)
+    if max(indexes.values()) >= table.num_columns:
+        raise ValueError(f"Expected 4 columns, found {table.num_columns}")
+
+    raw = {}
+    for key, index in indexes.items():
+        column = table.column(index)
+        if key == "category":
+            raw[key] = column.to_numpy()
+        elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_null(column.type):
+            # Nulls come out as NaN
+            raw[key] = pc.cast(column, pa.float64()).to_numpy()
+        else:
+            raw[key] = column.to_numpy()
+    return validate_columns(raw, first_row)
+
+
+def read_csv_columns(file_path, mapping=None):
+    with open(file_path, "rb") as f:
+        return parse_csv(f, mapping=mapping)
+
+
+def parse_csv(f, first_row=2, mapping=None):
+    # f is a binary file object positioned on the header line; first_row is
+    # the line number of the first data row, for the error report
+    start = f.tell()
+    delimiter = csv_delimiter(f.readline())
+    # pyarrow rejects a file with no line after the header (a log just
+    # created); the csv module returns empty columns for it
+    has_rows = bool(f.read(1))
+    f.seek(start)
+
+    if HAVE_ARROW and has_rows:
+        import pyarrow.csv as pa_csv
+
+        # pyarrow cannot say where a skipped row was among the ones it kept, so
+        # a file with a row of the wrong width goes through the csv module
+        # instead, which reports it with its line number
+        uneven = []
+
+        def skip_row(row):
+            uneven.append(row)
+            return "skip"
+
+        options = pa_csv.ParseOptions(delimiter=delimiter, invalid_row_handler=skip_row)
+        table = pa_csv.read_csv(f, parse_options=options)
+        if not uneven:
+            return table_to_columns(table, first_row, mapping)
+        f.seek(start)
+
+    # Without pyarrow: csv module in chunks, each chunk validated in one go
+    blocks = []
+    with io.TextIOWrapper(f, encoding="utf-8-sig", newline="") as text:
+        reader = csv.reader(text, delimiter=delimiter)
+        header = next(reader, [])
+        indexes = resolve_columns(header, mapping)
+        width = max(indexes.values()) + 1
+        padding = [""] * width
+        while True:
+            rows = list(islice(reader, CHUNK_ROWS))
+            if not rows:
+                break
+            cells = list(zip(*[(row + padding)[:width] for row in rows]))
+            # Blank lines are skipped like blank rows; others must match the header
+            fields = np.array([len(row) for row in rows])
+            uneven = (fields != len(header)) & (fields > 0)
+            checks = [("fields", uneven, f"not {len(header)} fields as in the header")] if uneven.any() else []
+            raw = {key: cells[index] for key, index in indexes.items()}
+            blocks.append(validate_columns(raw, first_row, checks))
+            first_row += len(rows)
+
+    return concat_blocks(blocks)
+
+
+def read_parquet_columns(file_path, mapping=None):
+    import pyarrow.parquet as pq
+
+    return table_to_columns(pq.read_table(file_path), mapping=mapping)
+
+
+# Input readers by file extension
+READERS = {ext: read_excel_columns for ext in EXCEL_EXTENSIONS}
+READERS[".csv"] = read_csv_columns
+if HAVE_ARROW:
+    READERS[".parquet"] = read_parquet_columns
+
+
+def read_columns(file_path, mapping=None):
+    # mapping: header aliases per column, COLUMN_ALIASES when None
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return READERS[ext](file_path, mapping=mapping)
+
+
+# -----------------------------------------------------
+# Several sheets / files in one import
+# -----------------------------------------------------
+def sheet_names(file_path):
+    # Straight from the workbook part: openpyxl would size every sheet first,
+    # which means parsing them all when the files carry no dimension record
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    except KeyError:
+        import openpyxl
+
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return wb.sheetnames
+        finally:
+            wb.close()
+    return [element.get("name") for element in root.iter() if element.tag.rpartition("}")[2] == "sheet"]
+
+
+def list_sources(paths, sheets=None):
+    # One (file_path, sheet) source per sheet to read. sheets=None takes every
+    # sheet; otherwise only the named ones, in the workbooks that have them.
+    # Other formats hold a single table: (file_path, None).
+    sources = []
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in EXCEL_EXTENSIONS:
+            sources += [(path, name) for name in sheet_names(path) if sheets is None or name in sheets]
+        else:
+            sources.append((path, None))
+    return sources
+
+
+def read_file_sources(file_path, sheets, mapping=None):
+    # Blocks for one file, labelled for the error report
+    name = os.path.basename(file_path)
+    if sheets == [None]:
+        blocks, labels = [read_columns(file_path, mapping)], [name]
+    else:
+        blocks, labels = read_excel_sheets(file_path, sheets, mapping), [f"{name} / {sheet}" for sheet in sheets]
+    for block, label in zip(blocks, labels):
+        block["errors"]["source"] = label
+    return blocks
+
+
+def read_source(source, mapping=None):
+    file_path, sheet = source
+    return read_file_sources(file_path, [sheet], mapping)[0]
+
+
+def read_sources(sources, workers=1, mapping=None):
+    # With several workers each sheet is parsed in its own process; otherwise
+    # the sheets of a workbook are read from a single open. Blocks are
+    # concatenated in source order either way, so one aggregation over the
+    # result gives the same totals whatever order the workers finish in.
+    if workers > 1 and len(sources) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+            blocks = list(executor.map(read_source, sources, [mapping] * len(sources)))
+    else:
+        blocks = []
+        for file_path, group in groupby(sources, key=lambda source: source[0]):
+            blocks += read_file_sources(file_path, [sheet for _, sheet in group], mapping)
+    return concat_blocks(blocks)
+
+
+# -----------------------------------------------------
+# Aggregation
+# -----------------------------------------------------
+def pumped_volume(columns):
+    # final - initial, with the meter capacity added back where it rolled over
+    pumped = columns["final"] - columns["initial"]
+    if "wrap" in columns:
+        pumped += columns["wrap"]
+    return pumped
+
+
+def aggregate_columns(columns):
+    station = columns["station"]
+    pumped = pumped_volume(columns)
+
+    if len(station) == 0:
+        return pumped, {}, 0
+
+    # bincount adds weights in row order, so totals match a row-by-row loop
+    # (aggregate_rows in bench.py) exactly
+    if station.min() >= 0 and station.max() < DENSE_STATION_LIMIT:
+        sums = np.bincount(station, weights=pumped)
+        present = np.flatnonzero(np.bincount(station))
+        totals = sums[present]
+    else:
+        present, inverse = np.unique(station, return_inverse=True)
+        totals = np.bincount(inverse, weights=pumped)
+
+    station_totals = dict(zip(present.tolist(), totals.tolist()))
+    grand_total = float(np.cumsum(pumped)[-1])
+
+    return pumped, station_totals, grand_total
+
+
+CATEGORIES = ("Essence", "Gasoil")
+
+
+def to_fixed(values, places):
+    # Float column -> int64 count of 10**-places units. check_fixed has
+    # rejected values with more decimals, so this only removes float noise;
+    # ties would go half up, as Decimal does in the model
+    return np.floor(values * 10 ** places + 0.5).astype(np.int64)
+
+
+def fixed_volume(columns):
+    # pumped_volume in centilitres; each reading is converted on its own, as the model does
+    liters = to_fixed(columns["final"], LITER_PLACES) - to_fixed(columns["initial"], LITER_PLACES)
+    if "wrap" in columns:
+        liters += to_fixed(columns["wrap"], LITER_PLACES)
+    return liters
+
+
+def extra_decimals(values, places):
+    # Values with more than places decimals, beyond the float noise of a
+    # spreadsheet; NaN is never flagged
+    scaled = values * 10 ** places
+    return np.abs(scaled - np.rint(scaled)) > FIXED_TOLERANCE
+
+
+def check_fixed(columns, priced=True):
+    # The exact path counts centilitres and millimes: a finer reading or price
+    # raises ValueError, as in Station.fixed_totals, rather than being rounded.
+    # The litre totals do not need this and keep such rows.
+    station, pump = columns["station"], columns["pump"]
+    extra = np.flatnonzero(extra_decimals(columns["initial"], LITER_PLACES) | extra_decimals(columns["final"], LITER_PLACES))
+    if len(extra):
+        i = extra[0]
+        raise ValueError(f"Station {station[i]}: relevé avec plus de {LITER_PLACES} décimales pour la pompe {pump[i]}")
+    if priced:
+        extra = np.flatnonzero(extra_decimals(columns["price"], PRICE_PLACES))
+        if len(extra):
+            i = extra[0]
+            category = CATEGORIES[0] if columns["category"][i] == CATEGORIES[0] else CATEGORIES[1]
+            raise ValueError(f"Station {station[i]}: prix {category} avec plus de {PRICE_PLACES} décimales")
+
+
+def exact_bincount(group, values, minlength):
+    # Integer sums per group. bincount adds in float64, which is exact while
+    # every partial sum stays below 2**53; beyond that int64 adds are used.
+    if int(np.abs(values).sum()) < 2 ** 53:
+        return np.bincount(group, weights=values, minlength=minlength).astype(np.int64)
+    sums = np.zeros(minlength, dtype=np.int64)
+    np.add.at(sums, group, values)
+    return sums
+
+
+def round_money_column(units):
+    # round_money over an int64 array
+    scale = 10 ** (LITER_PLACES + PRICE_PLACES - 2)
+    centimes = (np.abs(units) * 2 + scale) // (2 * scale)
+    return np.where(units < 0, -centimes, centimes) / 100
+
+
+def aggregate_categories(columns, exact=False):
+    # Litres and revenue per station and category in one grouped pass, in the
+    # layout of compute_totals: results rows [name, le, re, lg, rg] and grand.
+    # Each row uses its own price; without a price column only the litres are
+    # summed and the revenues are None. As in Station.totals, anything that is
+    # not Essence counts as Gasoil, and a missing price raises ValueError.
+    # exact: as compute_totals(exact=True), in centilitres and millimes.
+    if "category" not in columns:
+        raise ValueError("No category column")
+    station = columns["station"]
+    gasoil = (columns["category"] != CATEGORIES[0]).astype(np.int64)
+    priced = "price" in columns
+    price = columns["price"] if priced else np.zeros(len(station))
+
+    if len(station) == 0:
+        return [], [0, 0, 0, 0] if priced else [0, None, 0, None]
+
+    if station.min() >= 0 and station.max() < DENSE_STATION_LIMIT:
+        present = np.flatnonzero(np.bincount(station))
+        group = station * 2 + gasoil
+        rows = present
+    else:
+        present, inverse = np.unique(station, return_inverse=True)
+        group = inverse * 2 + gasoil
+        rows = np.arange(len(present))
+
+    size = int(group.max()) + 1
+    size += size % 2
+    unpriced = np.argwhere(np.bincount(group, weights=np.isnan(price), minlength=size).reshape(-1, 2)[rows])
+    if len(unpriced):
+        i, category = unpriced[0]
+        raise ValueError(f"Station {present[i]}: prix {CATEGORIES[category]} invalide")
+
+    if exact:
+        check_fixed(columns, priced)
+        liters = fixed_volume(columns)
+        revenue = liters * to_fixed(price, PRICE_PLACES)
+        liter_sums = exact_bincount(group, liters, size).reshape(-1, 2)[rows]
+        revenue_sums = exact_bincount(group, revenue, size).reshape(-1, 2)[rows]
+        fixed = [sum(sums.tolist()) for sums in (liter_sums[:, 0], revenue_sums[:, 0], liter_sums[:, 1], revenue_sums[:, 1])]
+        liter_sums = liter_sums / 10 ** LITER_PLACES
+        revenue_sums = round_money_column(revenue_sums)
+    else:
+        # bincount adds in row order, so each sum matches Station.totals
+        liters = pumped_volume(columns)
+        liter_sums = np.bincount(group, weights=liters, minlength=size).reshape(-1, 2)[rows]
+        revenue_sums = np.bincount(group, weights=liters * price, minlength=size).reshape(-1, 2)[rows]
+
+    results = []
+    grand = [0, 0, 0, 0]
+    for number, (le, lg), (re, rg) in zip(present.tolist(), liter_sums.tolist(), revenue_sums.tolist()):
+        totals = (le, re, lg, rg)
+        for i, value in enumerate(totals):
+            grand[i] += value
+        results.append([f"Station {number}", *totals])
+    if exact:
+        # Grand totals are rounded from the exact sums, not from the rows
+        grand = round_totals(fixed)
+    if not priced:
+        for totals in results + [grand]:
+            totals[-3] = totals[-1] = None
+    return results, grand
+
+
+def category_details(columns, exact=False):
+    # Detail rows in the layout of compute_totals, streamed to the exporters
+    if exact:
+        pumped = fixed_volume(columns) / 10 ** LITER_PLACES
+    else:
+        pumped = pumped_volume(columns)
+    return (
+        [f"Station {station}", initial, final, liters, category]
+        for station, initial, final, liters, category in zip(
+            columns["station"].tolist(),
+            columns["initial"].tolist(),
+            columns["final"].tolist(),
+            pumped.tolist(),
+            columns["category"].tolist(),
+        )
+    )
+
+
+def category_lines(results, grand):
+    # Same text as GasCalculator.calculate_totals
+    lines = []
+    for name, le, re, lg, rg in results:
+        lines.append(f"{name}:\n")
+        lines.append(category_line("Essence", le, re))
+        lines.append(category_line("Gasoil", lg, rg))
+    lines.append("Totaux généraux:\n")
+    lines.append(category_line("Essence", grand[0], grand[1]))
+    lines.append(category_line("Gasoil", grand[2], grand[3]))
+    return lines
+
+
+def category_line(category, liters, revenue):
+    # revenue is None when the file has no price column
+    if revenue is None:
+        return f"  {category}: {liters} L\n"
+    return f"  {category}: {liters} L, Chiffre d'affaires: {revenue} DH\n"
+
+
+# -----------------------------------------------------
+# Report
+# -----------------------------------------------------
+class ExcelReport:
+    # Report lines are formatted on demand, so a virtual view only pays for what it shows
+    def __init__(self, columns, pumped, station_totals, grand_total, categories=None):
+        # categories: (results, grand) from aggregate_categories, shown after the litres
+        self.station = columns["station"]
+        self.pump = columns["pump"]
+        self.pumped = pumped
+
+        self.summary = ["\n", "==============================\n"]
+        for station, total in station_totals.items():
+            self.summary.append(f"Total for Station {station}: {total} liters\n")
+        self.summary.append("==============================\n")
+        self.summary.append(f"Grand Total: {grand_total} liters\n")
+        self.summary.append("==============================\n")
+
+        if categories is not None:
+            self.summary.extend(category_lines(*categories))
+            self.summary.append("==============================\n")
+
+        errors = columns.get("errors")
+        if errors is not None and len(errors):
+            # Row numbers restart in every sheet and file: a row is its source and number
+            left_out = errors[~errors["kept"]]
+            skipped = len(set(zip(left_out["source"].tolist(), left_out["row"].tolist())))
+            self.summary.append(f"Rows skipped: {skipped} ({len(errors)} problems)\n")
+            self.summary.extend(error_lines(errors))
+            self.summary.append("==============================\n")
+
+    def __len__(self):
+        return len(self.pumped) + len(self.summary)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        n = len(self.pumped)
+        lines = [
+            f"Station {station} - Pump {pump}: {liters} liters\n"
+            for station, pump, liters in zip(
+                self.station[start:stop].tolist(), self.pump[start:stop].tolist(), self.pumped[start:stop].tolist()
+            )
+        ]
+        return lines + self.summary[max(start - n, 0):max(stop - n, 0)]
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,290 @@
+import contextlib
+import csv
+import importlib.util
+import os
+import threading
+from datetime import datetime
+
+from gas_trace import stage
+
+# openpyxl and pyarrow are imported by the functions that write or read a
+# file, so opening a window does not wait for them
+HAVE_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+STATION_HEADER = ["Station", "Essence (L)", "Chiffre d'affaires Essence (DH)", "Gasoil (L)", "Chiffre d'affaires Gasoil (DH)"]
+DETAIL_HEADER = ["Station", "Initial", "Final", "Litres", "Catégorie"]
+ERROR_HEADER = ["Source", "Ligne", "Colonne", "Motif", "Comptée"]
+
+# Exporters call progress(rows_written) every PROGRESS_EVERY rows
+PROGRESS_EVERY = 1000
+
+# Rows per record batch in the columnar formats
+ARROW_BATCH_ROWS = 65536
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def report_folder():
+    # Dynamic folder path (works on any laptop)
+    folder_path = os.path.join(os.path.expanduser("~"), "Documents", "GasReports")
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    return folder_path
+
+
+def report_filename(folder_path, date=None, fmt="xlsx"):
+    if date is None:
+        date = datetime.now().strftime("%Y-%m-%d")
+    return os.path.join(folder_path, f"Gas_Station_Report_{date}.{fmt}")
+
+
+def iter_detail_records(detailed_results):
+    # "Pompes Détails" rows -> (station, pump, category, initial, final, liters).
+    # Pumps are numbered per station and category, as in the pump table.
+    counts = {}
+    for name, initial, final, liters, category in detailed_results:
+        station = int(str(name).replace("Station", "").strip())
+        counts[station, category] = counts.get((station, category), 0) + 1
+        yield station, counts[station, category], category, initial, final, liters
+
+
+def iter_report_details(file_path):
+    # "Pompes Détails" rows of a saved xlsx report, in the DETAIL_HEADER layout.
+    # Litres-only reports from the batch CLI have another layout: ValueError.
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if "Pompes Détails" not in wb.sheetnames:
+            raise ValueError(f"{file_path}: no \"Pompes Détails\" sheet")
+        rows = wb["Pompes Détails"].iter_rows(max_col=5, values_only=True)
+        if list(next(rows, ())) != DETAIL_HEADER:
+            raise ValueError(f"{file_path}: not a pump detail report")
+        for row in rows:
+            if len(row) == 5 and row[0] is not None and row[1] is not None and row[2] is not None:
+                yield row
+    finally:
+        wb.close()
+
+
+def table_filenames(filename):
+    # CSV and columnar formats hold one table per file
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_Stations_Totaux{ext}", f"{stem}_Pompes_Details{ext}"
+
+
+def error_report_filename(filename):
+    return f"{os.path.splitext(filename)[0]}_Erreurs.csv"
+
+
+@contextlib.contextmanager
+def replace_on_success(filenames):
+    # Exporters write to temporary files next to the real ones. Those replace
+    # the real files only once everything is written; on ExportCancelled or
+    # any error they are deleted and the previous report is left as it was.
+    # They are created by the exporters, so they get the usual umask mode
+    # (mkstemp files would be owner-only, and os.replace keeps that).
+    tmp_paths = []
+    for filename in filenames:
+        stem, ext = os.path.splitext(filename)
+        tmp_paths.append(f"{stem}.{os.getpid()}.part{ext}")
+    try:
+        yield tmp_paths
+        for tmp_path, filename in zip(tmp_paths, filenames):
+            os.replace(tmp_path, filename)
+    except BaseException:
+        for tmp_path in tmp_paths:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        raise
+
+
+def save_error_report(filename, errors):
+    # Rows rejected by the import validation, next to the report they were left out of
+    path = error_report_filename(filename)
+    with replace_on_success([path]) as (tmp_path,):
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ERROR_HEADER)
+            # Rollovers are reported but still counted in the totals
+            writer.writerows(
+                (source, row, column, reason, "oui" if kept else "non")
+                for source, row, column, reason, kept in errors.tolist()
+            )
+    return path
+
+
+class RowCounter:
+    def __init__(self, progress):
+        self.progress = progress
+        self.written = 0
+
+    def rows(self, rows):
+        for row in rows:
+            yield row
+            self.written += 1
+            if self.progress and self.written % PROGRESS_EVERY == 0:
+                self.progress(self.written)
+
+    def finish(self):
+        if self.progress:
+            self.progress(self.written)
+
+
+def save_report(filename, results, detailed_results, station_header=STATION_HEADER, detail_header=DETAIL_HEADER,
+                progress=None):
+    from openpyxl import Workbook
+
+    # Write-only workbook: rows are streamed to disk as they are appended, so
+    # detailed_results can be a generator and memory stays bounded
+    wb = Workbook(write_only=True)
+    counter = RowCounter(progress)
+
+    try:
+        ws1 = wb.create_sheet("Stations Totaux")
+        ws1.append(station_header)
+        for row in counter.rows(results):
+            ws1.append(row)
+
+        ws2 = wb.create_sheet("Pompes Détails")
+        ws2.append(detail_header)
+        for row in counter.rows(detailed_results):
+            ws2.append(row)
+
+        counter.finish()
+    except Exception:
+        # Cancelled or failed: close the sheet streams so the temporary files are released
+        for ws in wb.worksheets:
+            ws.close()
+        raise
+
+    with stage("wb.save", rows=counter.written), replace_on_success([filename]) as (tmp_path,):
+        wb.save(tmp_path)
+    return [filename]
+
+
+def save_csv_report(filename, results, detailed_results, station_header=STATION_HEADER, detail_header=DETAIL_HEADER,
+                    progress=None):
+    counter = RowCounter(progress)
+    filenames = table_filenames(filename)
+    with replace_on_success(filenames) as tmp_paths:
+        for path, header, rows in zip(tmp_paths, (station_header, detail_header), (results, detailed_results)):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(counter.rows(rows))
+        counter.finish()
+    return list(filenames)
+
+
+def _record_batches(header, rows, counter):
+    import pyarrow as pa
+
+    batch = []
+    for row in counter.rows(rows):
+        batch.append(row)
+        if len(batch) == ARROW_BATCH_ROWS:
+            yield pa.RecordBatch.from_arrays([pa.array(col) for col in zip(*batch)], names=header)
+            batch = []
+    if batch:
+        yield pa.RecordBatch.from_arrays([pa.array(col) for col in zip(*batch)], names=header)
+
+
+def _save_columnar(filename, results, detailed_results, station_header, detail_header, progress, open_writer):
+    import pyarrow as pa
+
+    counter = RowCounter(progress)
+    filenames = table_filenames(filename)
+    with replace_on_success(filenames) as tmp_paths:
+        for path, header, rows in zip(tmp_paths, (station_header, detail_header), (results, detailed_results)):
+            writer = None
+            try:
+                for batch in _record_batches(header, rows, counter):
+                    if writer is None:
+                        schema = batch.schema
+                        writer = open_writer(path, schema)
+                    writer.write_batch(batch.cast(schema))
+                if writer is None:
+                    # No rows: still write the header as an all-null schema
+                    schema = pa.schema([(name, pa.null()) for name in header])
+                    writer = open_writer(path, schema)
+            finally:
+                # Closing a cut-short file still leaves it valid; it is deleted
+                # by replace_on_success, never put in place of the report
+                if writer is not None:
+                    writer.close()
+        counter.finish()
+    return list(filenames)
+
+
+def save_parquet_report(filename, results, detailed_results, station_header=STATION_HEADER,
+                        detail_header=DETAIL_HEADER, progress=None):
+    import pyarrow.parquet as pq
+
+    return _save_columnar(filename, results, detailed_results, station_header, detail_header, progress, pq.ParquetWriter)
+
+
+def save_arrow_report(filename, results, detailed_results, station_header=STATION_HEADER,
+                      detail_header=DETAIL_HEADER, progress=None):
+    import pyarrow as pa
+
+    return _save_columnar(filename, results, detailed_results, station_header, detail_header, progress, pa.ipc.new_file)
+
+
+# Output formats by file extension; xlsx stays the default everywhere
+EXPORTERS = {
+    "xlsx": save_report,
+    "csv": save_csv_report,
+}
+if HAVE_ARROW:
+    EXPORTERS["parquet"] = save_parquet_report
+    EXPORTERS["arrow"] = save_arrow_report
+
+
+class ExportJob:
+    # Runs save_report on a worker thread. The Tk side polls written/done with
+    # root.after; cancel() stops the job at the next progress check.
+    def __init__(self, filename, results, detailed_results, exporter=save_report, **kwargs):
+        self.filename = filename
+        self.exporter = exporter
+        self.filenames = []
+        self.results = results
+        self.detailed_results = detailed_results
+        self.kwargs = kwargs
+        self.total = len(results) + len(detailed_results)
+        self.written = 0
+        self.error = None
+        self.done = False
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def percent(self):
+        return int(100 * self.written / self.total) if self.total else 100
+
+    def _progress(self, written):
+        self.written = written
+        if self._cancelled.is_set():
+            raise ExportCancelled()
+
+    def _run(self):
+        try:
+            with stage(f"export {os.path.basename(self.filename)}") as info:
+                self.filenames = self.exporter(
+                    self.filename, self.results, self.detailed_results, progress=self._progress, **self.kwargs
+                )
+                info["rows"] = self.written
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
@@ -0,0 +1,186 @@
+# Incremental re-import for meter logs that grow during the day. For each file
+# we remember how much was already processed, a checksum of that prefix, the
+# totals. A re-import only aggregates the new rows; if the prefix checksum no
+# longer matches, the file is reloaded in full.
+#
+# CSV files are resumed from a byte offset, so old rows are not even parsed:
+# their columns are kept with the state. Other formats cannot be resumed
+# mid-file: they are read again (through the parse cache when given one) and
+# only the rows past the old count are aggregated, so only totals are kept.
+# The least recently imported files are dropped once the folder passes
+# max_bytes.
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from gas_cache import cache_folder
+from gas_engine import read_columns, parse_csv, aggregate_columns, concat_blocks, KEYS
+
+STATE_VERSION = 6
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def merge_totals(station_totals, grand_total, new_totals, new_grand_total):
+    merged = dict(station_totals)
+    for station, total in new_totals.items():
+        merged[station] = merged.get(station, 0) + total
+    return dict(sorted(merged.items())), grand_total + new_grand_total
+
+
+def columns_hash(columns, rows):
+    digest = hashlib.sha256()
+    for key in KEYS:
+        digest.update(np.ascontiguousarray(columns[key][:rows]).tobytes())
+    return digest.hexdigest()
+
+
+class IncrementalImporter:
+    def __init__(self, folder=None, reader=read_columns, mapping=None, max_bytes=DEFAULT_MAX_BYTES):
+        # mapping is the column mapping given to the CSV parser; pass the same
+        # one to reader
+        self.folder = folder or os.path.join(cache_folder(), "incremental")
+        self.reader = reader
+        self.mapping = mapping
+        self.max_bytes = max_bytes
+        self.state_path = os.path.join(self.folder, "state.json")
+        os.makedirs(self.folder, exist_ok=True)
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+            if self.state.get("version") != STATE_VERSION:
+                raise ValueError
+        except (OSError, ValueError):
+            self.state = {"version": STATE_VERSION, "files": {}}
+
+    def _entry_path(self, path):
+        return os.path.join(self.folder, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".npz")
+
+    def _load(self, path):
+        info = self.state["files"].get(path)
+        if info is None:
+            return None, None
+        try:
+            with np.load(self._entry_path(path), allow_pickle=False) as data:
+                columns = {key: data[key] for key in data.files if not key.startswith("total_")}
+                station_totals = dict(zip(data["total_station"].tolist(), data["total_liters"].tolist()))
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return info, (columns, station_totals, info["grand_total"])
+
+    def _save(self, path, info, station_totals, grand_total, columns=None):
+        # columns: the CSV resume state; None for formats that are read again
+        entry_path = self._entry_path(path)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                total_station=np.array(list(station_totals), dtype=np.int64),
+                total_liters=np.array(list(station_totals.values()), dtype=np.float64),
+                **(columns or {}),
+            )
+        os.replace(tmp_path, entry_path)
+
+        info["grand_total"] = grand_total
+        info["bytes"] = os.path.getsize(entry_path)
+        info["last_used"] = time.time()
+        self.state["files"][path] = info
+        self._evict(path)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _evict(self, keep):
+        # Least recently imported files go first until the folder fits max_bytes
+        files = self.state["files"]
+        total = sum(info.get("bytes", 0) for info in files.values())
+        for path in sorted(files, key=lambda p: files[p].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= files.pop(path).get("bytes", 0)
+            try:
+                os.remove(self._entry_path(path))
+            except OSError:
+                pass
+
+    def import_file(self, file_path):
+        # Returns columns, station_totals, grand_total and the number of rows
+        # that were new since the previous import
+        path = os.path.abspath(file_path)
+        if os.path.splitext(path)[1].lower() == ".csv":
+            return self._import_csv(path)
+        return self._import_rows(path)
+
+    def _import_rows(self, path):
+        columns = self.reader(path)
+        info, previous = self._load(path)
+        rows = len(columns["station"])
+
+        if previous and info["rows"] <= rows and columns_hash(columns, info["rows"]) == info["prefix"]:
+            _, station_totals, grand_total = previous
+            # Every column but errors: the rollover wrap is needed for the volumes
+            new_columns = {key: values[info["rows"]:] for key, values in columns.items() if key != "errors"}
+        else:
+            # First import, or the already-imported rows were edited: start over
+            station_totals, grand_total = {}, 0
+            new_columns = columns
+
+        _, new_totals, new_grand_total = aggregate_columns(new_columns)
+        station_totals, grand_total = merge_totals(station_totals, grand_total, new_totals, new_grand_total)
+
+        self._save(path, {"rows": rows, "prefix": columns_hash(columns, rows)}, station_totals, grand_total)
+        return columns, station_totals, grand_total, len(new_columns["station"])
+
+    def _import_csv(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        header = data[:data.find(b"\n") + 1]
+        info, previous = self._load(path)
+
+        offset = 0
+        if previous and info["offset"] <= len(data):
+            if hashlib.sha256(data[:info["offset"]]).hexdigest() == info["prefix"]:
+                offset = info["offset"]
+
+        if offset:
+            columns, station_totals, grand_total = previous
+        else:
+            columns = concat_blocks([])
+            station_totals, grand_total = {}, 0
+            offset = len(header)
+        first_row = 2 + data.count(b"\n", len(header), offset)
+
+        # Only complete lines are committed; a line still being written is
+        # counted in this result but read again next time
+        end = data.rfind(b"\n", offset) + 1 or offset
+        committed = parse_csv(io.BytesIO(header + data[offset:end]), first_row, self.mapping)
+        _, new_totals, new_grand_total = aggregate_columns(committed)
+        columns = concat_blocks([columns, committed])
+        station_totals, grand_total = merge_totals(station_totals, grand_total, new_totals, new_grand_total)
+
+        prefix = hashlib.sha256(data[:end]).hexdigest()
+        self._save(path, {"offset": end, "prefix": prefix}, station_totals, grand_total, columns)
+        new_rows = len(committed["station"])
+
+        if end < len(data):
+            try:
+                tail = parse_csv(
+                    io.BytesIO(header + data[end:]), first_row + data.count(b"\n", offset, end), self.mapping
+                )
+            except ValueError:
+                tail = None
+            if tail is None or len(tail["errors"]):
+                # Half-written line that does not parse yet: left for next time
+                return columns, station_totals, grand_total, new_rows
+            _, tail_totals, tail_grand_total = aggregate_columns(tail)
+            columns = concat_blocks([columns, tail])
+            station_totals, grand_total = merge_totals(station_totals, grand_total, tail_totals, tail_grand_total)
+            new_rows += len(tail["station"])
+
+        return columns, station_totals, grand_total, new_rows
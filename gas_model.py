@@ -0,0 +1,311 @@
+# Headless station/pump model. The Tk windows are only views over it, so the
+# same objects can be filled from scripts without a display. Every edit pushes
+# its delta to the station and network running totals, so live totals cost
+# O(1) per edit; compute_totals still does the full pass used for reports.
+import math
+from decimal import Decimal, InvalidOperation
+
+# Units of the exact money path: readings in centilitres, prices in millimes,
+# so a revenue is a whole number of centilitres x millimes (1e-5 DH)
+LITER_PLACES = 2
+PRICE_PLACES = 3
+
+
+def parse_number(text):
+    # "nan" and "inf" would stick in the running totals: invalid, like any other text
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_fixed(text, places):
+    # "1234.56" -> 123456 for places=2. Nothing is rounded: None when the
+    # text is not a number or has more than places decimals
+    try:
+        value = Decimal(text)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    if not value.is_finite():
+        return None
+    scaled = value.scaleb(places)
+    if scaled != scaled.to_integral_value():
+        return None
+    return int(scaled)
+
+
+def round_money(units):
+    # centilitres x millimes -> DH, half up to the centime
+    scale = 10 ** (LITER_PLACES + PRICE_PLACES - 2)
+    centimes, rest = divmod(abs(units), scale)
+    centimes += rest * 2 >= scale
+    return (centimes if units >= 0 else -centimes) / 100
+
+
+def round_totals(fixed):
+    # Integer (litres, revenue, litres, revenue) of the exact path -> the
+    # report's litres and DH. This is the only place they are rounded.
+    liters_essence, revenue_essence, liters_gasoil, revenue_gasoil = fixed
+    return [
+        liters_essence / 10 ** LITER_PLACES,
+        round_money(revenue_essence),
+        liters_gasoil / 10 ** LITER_PLACES,
+        round_money(revenue_gasoil),
+    ]
+
+
+class Pump:
+    __slots__ = (
+        "station", "number", "category", "initial", "final", "initial_cl", "final_cl", "_initial_text", "_final_text",
+    )
+
+    def __init__(self, station, number, category="Essence"):
+        self.station = station
+        self.number = number
+        self.category = category
+        self.initial = None
+        self.final = None
+        self.initial_cl = None
+        self.final_cl = None
+        self._initial_text = ""
+        self._final_text = ""
+
+    @property
+    def station_name(self):
+        return self.station.name
+
+    # Readings are parsed once, when they are edited
+    @property
+    def initial_text(self):
+        return self._initial_text
+
+    @initial_text.setter
+    def initial_text(self, text):
+        old = self.liters
+        self._initial_text = text
+        self.initial = parse_number(text)
+        self.initial_cl = parse_fixed(text, LITER_PLACES)
+        self.station.pump_changed(self, old)
+
+    @property
+    def final_text(self):
+        return self._final_text
+
+    @final_text.setter
+    def final_text(self, text):
+        old = self.liters
+        self._final_text = text
+        self.final = parse_number(text)
+        self.final_cl = parse_fixed(text, LITER_PLACES)
+        self.station.pump_changed(self, old)
+
+    @property
+    def liters(self):
+        if self.initial is None or self.final is None:
+            return None
+        return self.final - self.initial
+
+    def is_invalid(self, field):
+        # Totals are exact to the centilitre: a reading with more decimals is flagged too
+        text = getattr(self, field)
+        value = field[:-len("_text")]
+        return text != "" and (getattr(self, value) is None or getattr(self, f"{value}_cl") is None)
+
+
+class Station:
+    __slots__ = (
+        "number", "name", "pumps", "network", "price_essence", "price_gasoil", "price_essence_m", "price_gasoil_m",
+        "_price_essence_text", "_price_gasoil_text", "liters_essence", "liters_gasoil", "missing",
+    )
+
+    def __init__(self, number, essence_pumps=0, gasoil_pumps=0):
+        self.number = number
+        self.name = f"Station {number}"
+        self.pumps = [Pump(self, p + 1, "Essence") for p in range(essence_pumps)]
+        self.pumps += [Pump(self, p + 1, "Gasoil") for p in range(gasoil_pumps)]
+        self.network = None
+        self.price_essence = None
+        self.price_gasoil = None
+        self.price_essence_m = None
+        self.price_gasoil_m = None
+        self._price_essence_text = ""
+        self._price_gasoil_text = ""
+
+        # Running totals, kept up to date by pump_changed and the price setters
+        self.liters_essence = 0
+        self.liters_gasoil = 0
+        self.missing = len(self.pumps)
+
+    @property
+    def price_essence_text(self):
+        return self._price_essence_text
+
+    @price_essence_text.setter
+    def price_essence_text(self, text):
+        old = self.price_essence or 0
+        self._price_essence_text = text
+        self.price_essence = parse_number(text)
+        self.price_essence_m = parse_fixed(text, PRICE_PLACES)
+        if self.network:
+            self.network.update(0, self.liters_essence * ((self.price_essence or 0) - old), 0, 0, 0)
+
+    @property
+    def price_gasoil_text(self):
+        return self._price_gasoil_text
+
+    @price_gasoil_text.setter
+    def price_gasoil_text(self, text):
+        old = self.price_gasoil or 0
+        self._price_gasoil_text = text
+        self.price_gasoil = parse_number(text)
+        self.price_gasoil_m = parse_fixed(text, PRICE_PLACES)
+        if self.network:
+            self.network.update(0, 0, 0, self.liters_gasoil * ((self.price_gasoil or 0) - old), 0)
+
+    @property
+    def liters(self):
+        # Both categories, for views that do not split them
+        return self.liters_essence + self.liters_gasoil
+
+    @property
+    def revenue_essence(self):
+        return self.liters_essence * (self.price_essence or 0)
+
+    @property
+    def revenue_gasoil(self):
+        return self.liters_gasoil * (self.price_gasoil or 0)
+
+    def pump_changed(self, pump, old_liters):
+        new_liters = pump.liters
+        delta = (new_liters or 0) - (old_liters or 0)
+        missing = (new_liters is None) - (old_liters is None)
+        self.missing += missing
+
+        if pump.category == "Essence":
+            self.liters_essence += delta
+            changes = (delta, delta * (self.price_essence or 0), 0, 0, missing)
+        else:
+            self.liters_gasoil += delta
+            changes = (0, 0, delta, delta * (self.price_gasoil or 0), missing)
+
+        if self.network:
+            self.network.update(*changes)
+
+    def is_invalid(self, field):
+        # Prices are exact to the millime: one with more decimals is flagged too
+        text = getattr(self, field)
+        value = field[:-len("_text")]
+        return text != "" and (getattr(self, value) is None or getattr(self, f"{value}_m") is None)
+
+    def totals(self):
+        # Raises ValueError when a reading or a price is missing or invalid
+        total_essence = 0
+        total_gasoil = 0
+        revenue_essence = 0
+        revenue_gasoil = 0
+        for pump in self.pumps:
+            liters = pump.liters
+            if liters is None:
+                raise ValueError(f"{self.name}: relevé invalide pour la pompe {pump.number}")
+            if pump.category == "Essence":
+                if self.price_essence is None:
+                    raise ValueError(f"{self.name}: prix Essence invalide")
+                total_essence += liters
+                revenue_essence += liters * self.price_essence
+            else:
+                if self.price_gasoil is None:
+                    raise ValueError(f"{self.name}: prix Gasoil invalide")
+                total_gasoil += liters
+                revenue_gasoil += liters * self.price_gasoil
+        return total_essence, revenue_essence, total_gasoil, revenue_gasoil
+
+    def fixed_totals(self):
+        # totals() in integers: centilitres, and centilitres x millimes. Each
+        # price multiplies its category's litres once, which is exact here.
+        total_essence = 0
+        total_gasoil = 0
+        for pump in self.pumps:
+            if pump.initial_cl is None or pump.final_cl is None:
+                if pump.liters is not None:
+                    raise ValueError(f"{self.name}: relevé avec plus de {LITER_PLACES} décimales pour la pompe {pump.number}")
+                raise ValueError(f"{self.name}: relevé invalide pour la pompe {pump.number}")
+            if pump.category == "Essence":
+                if self.price_essence_m is None:
+                    raise ValueError(self._price_error("Essence", self.price_essence))
+                total_essence += pump.final_cl - pump.initial_cl
+            else:
+                if self.price_gasoil_m is None:
+                    raise ValueError(self._price_error("Gasoil", self.price_gasoil))
+                total_gasoil += pump.final_cl - pump.initial_cl
+        return (
+            total_essence,
+            total_essence * (self.price_essence_m or 0),
+            total_gasoil,
+            total_gasoil * (self.price_gasoil_m or 0),
+        )
+
+
+    def _price_error(self, category, price):
+        if price is not None:
+            return f"{self.name}: prix {category} avec plus de {PRICE_PLACES} décimales"
+        return f"{self.name}: prix {category} invalide"
+
+
+def build_stations(station_pumps):
+    return [Station(s_index + 1, essence, gasoil) for s_index, (essence, gasoil) in enumerate(station_pumps)]
+
+
+def compute_totals(stations, exact=False):
+    # exact: sums are kept in integers (fixed_totals) and rounded once, for
+    # each station row and for the grand totals, by round_totals
+    results = []
+    detailed_results = []
+    grand = [0, 0, 0, 0]
+
+    for station in stations:
+        totals = station.fixed_totals() if exact else station.totals()
+        for pump in station.pumps:
+            liters = (pump.final_cl - pump.initial_cl) / 10 ** LITER_PLACES if exact else pump.liters
+            detailed_results.append([station.name, pump.initial, pump.final, liters, pump.category])
+        for i, value in enumerate(totals):
+            grand[i] += value
+        results.append([station.name, *(round_totals(totals) if exact else totals)])
+
+    if exact:
+        grand = round_totals(grand)
+    return results, detailed_results, grand
+
+
+class Network:
+    # Grand running totals over a list of stations; on_change(network) is
+    # called after every edit so a view can refresh in O(1)
+    def __init__(self, stations, on_change=None):
+        self.stations = stations
+        self.on_change = on_change
+        self.liters_essence = 0
+        self.revenue_essence = 0
+        self.liters_gasoil = 0
+        self.revenue_gasoil = 0
+        self.missing = 0
+        for station in stations:
+            station.network = self
+            self.liters_essence += station.liters_essence
+            self.revenue_essence += station.revenue_essence
+            self.liters_gasoil += station.liters_gasoil
+            self.revenue_gasoil += station.revenue_gasoil
+            self.missing += station.missing
+
+    @property
+    def liters(self):
+        # Both categories, for views that do not split them
+        return self.liters_essence + self.liters_gasoil
+
+    def update(self, liters_essence, revenue_essence, liters_gasoil, revenue_gasoil, missing):
+        self.liters_essence += liters_essence
+        self.revenue_essence += revenue_essence
+        self.liters_gasoil += liters_gasoil
+        self.revenue_gasoil += revenue_gasoil
+        self.missing += missing
+        if self.on_change:
+            self.on_change(self)
@@ -0,0 +1,205 @@
+# Day-to-day reconciliation of the report archive. Each day's "Pompes Détails"
+# rows are loaded once into the readings database; the initial reading of
+# every pump is then checked against its final reading on the previous
+# archived day. Mismatches are stored, so adding a day only compares it with
+# its neighbours through the (date, pump) index: O(pumps), whatever the size
+# of the archive.
+#
+#   python gas_reconcile.py [--folder DIR] [--db FILE] [--from DATE] [--to DATE]
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+from gas_db import connect, save_day, totals_by_station, totals_by_category
+from gas_export import report_folder, iter_report_details
+
+# Only the one report test2.py writes per day
+REPORT_PATTERN = re.compile(r"Gas_Station_Report_(\d{4}-\d{2}-\d{2})\.xlsx")
+
+# Readings are typed with two decimals; anything closer counts as equal
+TOLERANCE = 0.005
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    path TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS days (date TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS mismatches (
+    date TEXT NOT NULL,
+    previous_date TEXT NOT NULL,
+    station INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    pump INTEGER NOT NULL,
+    previous_final REAL NOT NULL,
+    initial REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_date_pump ON readings (date, station, category, pump, initial, final);
+CREATE INDEX IF NOT EXISTS mismatches_date ON mismatches (date);
+CREATE INDEX IF NOT EXISTS mismatches_previous_date ON mismatches (previous_date);
+"""
+
+
+def connect_archive(path=None):
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM days)").fetchone()[0]:
+        rebuild(conn)
+    return conn
+
+
+def rebuild(conn):
+    # One full pass, for days saved before reconciliation existed
+    with conn:
+        conn.execute("DELETE FROM mismatches")
+        conn.execute("INSERT OR IGNORE INTO days SELECT DISTINCT date FROM readings")
+        dates = [date for (date,) in conn.execute("SELECT date FROM days ORDER BY date")]
+        for previous, date in zip(dates, dates[1:]):
+            _compare(conn, previous, date)
+
+
+def _compare(conn, previous, date):
+    conn.execute(
+        "INSERT INTO mismatches (date, previous_date, station, category, pump, previous_final, initial)"
+        " SELECT cur.date, prev.date, cur.station, cur.category, cur.pump, prev.final, cur.initial"
+        " FROM readings AS cur JOIN readings AS prev"
+        " ON prev.date = ? AND prev.station = cur.station AND prev.category = cur.category AND prev.pump = cur.pump"
+        " WHERE cur.date = ? AND ABS(cur.initial - prev.final) > ?",
+        (previous, date, TOLERANCE),
+    )
+
+
+def reconcile_day(conn, date):
+    # Run after the readings of date were saved, replaced or deleted
+    with conn:
+        saved = conn.execute("SELECT 1 FROM readings WHERE date = ? LIMIT 1", (date,)).fetchone()
+        if saved:
+            conn.execute("INSERT OR IGNORE INTO days (date) VALUES (?)", (date,))
+        else:
+            conn.execute("DELETE FROM days WHERE date = ?", (date,))
+        previous = conn.execute("SELECT MAX(date) FROM days WHERE date < ?", (date,)).fetchone()[0]
+        following = conn.execute("SELECT MIN(date) FROM days WHERE date > ?", (date,)).fetchone()[0]
+
+        # The following day's previous day may have changed too
+        conn.execute("DELETE FROM mismatches WHERE date IN (?, ?) OR previous_date = ?", (date, following, date))
+        pairs = [(previous, date), (date, following)] if saved else [(previous, following)]
+        for earlier, later in pairs:
+            if earlier and later:
+                _compare(conn, earlier, later)
+    return day_mismatches(conn, date)
+
+
+def add_day(conn, date, detailed_results, file_path=None):
+    # Saves and reconciles one day; file_path is the xlsx report it came from,
+    # recorded so index_archive does not load it again
+    save_day(conn, date, detailed_results)
+    mismatches = reconcile_day(conn, date)
+    if file_path:
+        _record(conn, file_path, date)
+    return mismatches
+
+
+def _record(conn, file_path, date):
+    stat = os.stat(file_path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO archive (path, date, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(file_path), date, stat.st_size, stat.st_mtime_ns),
+        )
+
+
+def index_archive(conn, folder=None):
+    # New or re-saved reports are loaded and reconciled; unchanged ones cost a stat
+    folder = folder or report_folder()
+    known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM archive")}
+    added = []
+    skipped = []
+    for name in sorted(os.listdir(folder)):
+        match = REPORT_PATTERN.fullmatch(name)
+        if not match:
+            continue
+        path = os.path.abspath(os.path.join(folder, name))
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            # Removed or locked since listdir
+            skipped.append((path, str(e)))
+            continue
+        if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+            continue
+        try:
+            add_day(conn, match.group(1), iter_report_details(path), path)
+            added.append(path)
+        except sqlite3.Error:
+            raise
+        except Exception as e:
+            # Not a pump detail report, or not a readable workbook at all
+            # (BadZipFile, KeyError from a damaged one, ...): save_day rolled
+            # back, and the file is remembered so it is not opened again
+            skipped.append((path, f"{type(e).__name__}: {e}"))
+            try:
+                _record(conn, path, match.group(1))
+            except OSError:
+                pass
+    return added, skipped
+
+
+def day_mismatches(conn, date):
+    return conn.execute(
+        "SELECT date, previous_date, station, category, pump, previous_final, initial FROM mismatches"
+        " WHERE date = ? ORDER BY station, category, pump",
+        (date,),
+    ).fetchall()
+
+
+def period_mismatches(conn, start=None, end=None):
+    return conn.execute(
+        "SELECT date, previous_date, station, category, pump, previous_final, initial FROM mismatches"
+        " WHERE date >= ? AND date < ? ORDER BY date, station, category, pump",
+        (start or "0000-00-00", end or "9999-99-99"),
+    ).fetchall()
+
+
+def mismatch_line(mismatch):
+    date, previous_date, station, category, pump, previous_final, initial = mismatch
+    return (
+        f"{date} Station {station} Pompe {category} {pump}: initial {initial}"
+        f" au lieu de {previous_final} (final du {previous_date})"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile the daily reports: final of day N = initial of day N+1")
+    parser.add_argument("--folder", help="report folder (default: ~/Documents/GasReports)")
+    parser.add_argument("--db", help="database file (default: ~/Documents/GasReports/readings.db)")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="day after the last one, YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    conn = connect_archive(args.db)
+    try:
+        added, skipped = index_archive(conn, args.folder)
+        for path, error in skipped:
+            print(f"{path}: {error}", file=sys.stderr)
+        print(f"{len(added)} new reports indexed")
+
+        mismatches = period_mismatches(conn, args.start, args.end)
+        for mismatch in mismatches:
+            print(mismatch_line(mismatch))
+        print(f"{len(mismatches)} mismatches")
+
+        for station, liters in totals_by_station(conn, args.start, args.end).items():
+            print(f"Station {station}: {liters} L")
+        for category, liters in totals_by_category(conn, args.start, args.end).items():
+            print(f"{category}: {liters} L")
+    finally:
+        conn.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
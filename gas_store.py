@@ -0,0 +1,196 @@
+# Append-only columnar store for historical meter readings. Each column is a
+# flat binary file read back through np.memmap, so a query only touches the
+# columns (and, for time-ordered data, the row range) it needs.
+#
+#   python gas_store.py ingest Gas_Station_Report_2025-03-01.xlsx meters.csv ...
+#   python gas_store.py query --from 2025-03-01 --to 2025-04-01 [--by category]
+#
+# Single writer: appends from several processes at once are not supported.
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from gas_batch import report_date
+from gas_engine import read_columns, CATEGORIES
+from gas_export import iter_detail_records, iter_report_details
+
+COLUMNS = {
+    "station": np.int64,
+    "pump": np.int64,
+    "category": np.int8,
+    "initial": np.float64,
+    "final": np.float64,
+    "timestamp": np.int64,
+}
+UNKNOWN_CATEGORY = -1
+
+
+def store_folder():
+    return os.path.join(os.path.expanduser("~"), "Documents", "GasReports", "store")
+
+
+def category_code(category):
+    return CATEGORIES.index(category) if category in CATEGORIES else UNKNOWN_CATEGORY
+
+
+def to_timestamp(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d")
+    return int(value.timestamp())
+
+
+class ReadingStore:
+    def __init__(self, folder=None):
+        self.folder = folder or store_folder()
+        self.meta_path = os.path.join(self.folder, "meta.json")
+        os.makedirs(self.folder, exist_ok=True)
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {"sorted": True, "max_timestamp": None}
+
+    def _column_path(self, name):
+        return os.path.join(self.folder, f"{name}.bin")
+
+    def __len__(self):
+        # The shortest column wins, so a torn append is simply ignored
+        lengths = []
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return min(lengths)
+
+    def append(self, station, pump, initial, final, timestamp, category=None):
+        n = len(station)
+        if category is None:
+            category = np.full(n, UNKNOWN_CATEGORY, dtype=np.int8)
+        if np.isscalar(timestamp):
+            timestamp = np.full(n, timestamp, dtype=np.int64)
+        values = {
+            "station": station,
+            "pump": pump,
+            "category": category,
+            "initial": initial,
+            "final": final,
+            "timestamp": timestamp,
+        }
+
+        # Truncate any torn tail first so every column stays aligned
+        length = len(self)
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(name), "ab") as f:
+                f.truncate(length * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+
+        if n:
+            timestamp = np.asarray(timestamp)
+            max_timestamp = self.meta["max_timestamp"]
+            if max_timestamp is not None and timestamp.min() < max_timestamp:
+                self.meta["sorted"] = False
+            elif not np.all(timestamp[1:] >= timestamp[:-1]):
+                self.meta["sorted"] = False
+            self.meta["max_timestamp"] = int(max(timestamp.max(), max_timestamp or timestamp.max()))
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+
+    def column(self, name):
+        # Zero-copy, read-only view of one column
+        n = len(self)
+        if n == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(self._column_path(name), dtype=COLUMNS[name], mode="r", shape=(n,))
+
+    def _rows_between(self, start, end):
+        timestamp = self.column("timestamp")
+        start = to_timestamp(start) if start is not None else None
+        end = to_timestamp(end) if end is not None else None
+        if self.meta["sorted"]:
+            lo = 0 if start is None else int(np.searchsorted(timestamp, start, side="left"))
+            hi = len(timestamp) if end is None else int(np.searchsorted(timestamp, end, side="left"))
+            return slice(lo, hi)
+        mask = np.ones(len(timestamp), dtype=bool)
+        if start is not None:
+            mask &= timestamp >= start
+        if end is not None:
+            mask &= timestamp < end
+        return mask
+
+    def liters_by(self, key="station", start=None, end=None):
+        # Litres per station (or category) for readings in [start, end)
+        rows = self._rows_between(start, end)
+        keys = np.asarray(self.column(key)[rows], dtype=np.int64)
+        liters = self.column("final")[rows] - self.column("initial")[rows]
+        if len(keys) == 0:
+            return {}
+        present, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=liters)
+        return dict(zip(present.tolist(), totals.tolist()))
+
+
+# -----------------------------------------------------
+# Ingestion
+# -----------------------------------------------------
+def read_report_details(file_path):
+    # "Pompes Détails" sheet of a test2.py report: Station, Initial, Final, Litres, Catégorie
+    station, pump, category, initial, final = [], [], [], [], []
+    for s, p, c, i, f, _ in iter_detail_records(iter_report_details(file_path)):
+        station.append(s)
+        pump.append(p)
+        category.append(category_code(c))
+        initial.append(float(i))
+        final.append(float(f))
+    return station, pump, category, initial, final
+
+
+def ingest_file(store, file_path):
+    timestamp = to_timestamp(report_date(file_path))
+    if os.path.basename(file_path).startswith("Gas_Station_Report_"):
+        station, pump, category, initial, final = read_report_details(file_path)
+        store.append(station, pump, initial, final, timestamp, category)
+        return len(station)
+    columns = read_columns(file_path)
+    # Shifting a rolled-over reading down by the meter capacity keeps final - initial the volume
+    initial = columns["initial"] - columns.get("wrap", 0)
+    store.append(columns["station"], columns["pump"], initial, columns["final"], timestamp)
+    return len(columns["station"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historical meter readings store")
+    parser.add_argument("--store", help="store folder (default: ~/Documents/GasReports/store)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="append readings from reports or meter logs")
+    ingest.add_argument("files", nargs="+")
+
+    query = commands.add_parser("query", help="litres per station or category over a period")
+    query.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    query.add_argument("--to", dest="end", help="day after the last one, YYYY-MM-DD")
+    query.add_argument("--by", choices=["station", "category"], default="station")
+
+    args = parser.parse_args(argv)
+    store = ReadingStore(args.store)
+
+    if args.command == "ingest":
+        # Oldest first keeps the store time-ordered, so queries can binary search
+        for file_path in sorted(args.files, key=report_date):
+            print(f"{file_path}: {ingest_file(store, file_path)} readings")
+        return 0
+
+    for key, liters in store.liters_by(args.by, args.start, args.end).items():
+        if args.by == "category":
+            label = CATEGORIES[key] if key != UNKNOWN_CATEGORY else "Inconnue"
+        else:
+            label = f"Station {key}"
+        print(f"{label}: {liters} L")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# Opt-in timing of the slow stages: widget build, parsing, aggregation and
+# saving. Off unless GAS_TRACE is set or the script is started with --trace or
+# --profile; stage() then returns a shared no-op context and costs next to
+# nothing.
+#
+#   GAS_TRACE=1 python test2.py          JSON trace of every stage
+#   GAS_TRACE=profile python test2.py    the same, plus a cProfile dump
+#   python test3.py --trace | --profile
+#
+# Each stage records wall time, rows and peak traced memory above what was in
+# use when it started. The trace is in the Chrome trace event format (open it
+# in chrome://tracing or ui.perfetto.dev), the profile is read with
+# python -m pstats; both are written to GasReports/traces when the program
+# exits, or whenever dump() is called.
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+_OFF = contextlib.nullcontext({})
+_local = threading.local()
+
+enabled = False
+profiler = None
+events = []
+_started = 0.0
+
+
+def trace_folder():
+    return os.path.join(os.path.expanduser("~"), "Documents", "GasReports", "traces")
+
+
+def enable(profile=False):
+    global enabled, profiler, _started
+    if not enabled:
+        enabled = True
+        _started = time.perf_counter()
+        tracemalloc.start()
+    if profile and profiler is None:
+        # Only the calling thread is profiled, not the export worker
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+
+def disable():
+    # Stops tracing and drops what was recorded
+    global enabled, profiler
+    enabled = False
+    tracemalloc.stop()
+    if profiler is not None:
+        profiler.disable()
+        profiler = None
+    events.clear()
+
+
+def enable_from(argv=None):
+    # GAS_TRACE=1 or --trace: stage trace; GAS_TRACE=profile or --profile: with cProfile
+    argv = sys.argv if argv is None else argv
+    mode = os.environ.get("GAS_TRACE", "")
+    if "--profile" in argv or mode == "profile":
+        enable(profile=True)
+    elif "--trace" in argv or mode not in ("", "0"):
+        enable()
+
+
+def stage(name, rows=None):
+    # with stage("parse") as info: ... info["rows"] = len(data)
+    if not enabled:
+        return _OFF
+    return _stage(name, rows)
+
+
+@contextlib.contextmanager
+def _stage(name, rows):
+    stack = _local.__dict__.setdefault("stack", [])
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # reset_peak is global: keep the enclosing stage's peak so far
+        stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+    tracemalloc.reset_peak()
+    info = {"rows": rows, "peak": 0}
+    stack.append(info)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        peak = max(info["peak"], tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        peak_mb = max(peak - current, 0) / 1e6
+        events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - _started) * 1e6,
+            "dur": elapsed * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"rows": info["rows"], "peak_mb": round(peak_mb, 3)},
+        })
+        # Windowed builds have no stderr
+        if sys.stderr:
+            rows_text = f"  rows={info['rows']}" if info["rows"] is not None else ""
+            print(f"trace  {name}  {elapsed:.3f}s{rows_text}  peak={peak_mb:.1f} MB", file=sys.stderr)
+
+
+def dump(folder=None):
+    # Writes the trace so far, and the profile if one is running; returns the paths
+    if not enabled:
+        return []
+    folder = folder or trace_folder()
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+
+    paths = [os.path.join(folder, f"trace_{stamp}.json")]
+    with open(paths[0], "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": list(events), "displayTimeUnit": "ms"}, f)
+
+    if profiler is not None:
+        paths.append(os.path.join(folder, f"profile_{stamp}.prof"))
+        # dump_stats stops the profiler; it goes on for the rest of the run
+        profiler.dump_stats(paths[1])
+        profiler.enable()
+    return paths
+
+
+# Writes nothing unless tracing is still on at exit
+atexit.register(dump)
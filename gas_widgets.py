@@ -0,0 +1,193 @@
+import tkinter as tk
+
+# Above this many lines only the visible window is rendered into the Text widget
+VIRTUAL_THRESHOLD = 5000
+
+
+class VirtualText(tk.Frame):
+    def __init__(self, container, height=20, width=80, **kwargs):
+        super().__init__(container, **kwargs)
+        self.text = tk.Text(self, height=height, width=width, wrap="none")
+        self.scrollbar = tk.Scrollbar(self, orient="vertical")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", self._on_mousewheel)
+        self.text.bind("<Button-5>", self._on_mousewheel)
+
+        self.lines = []
+        self.top = 0
+        self.virtual = False
+        self.set_lines([])
+
+    def set_lines(self, lines):
+        self.lines = lines
+        self.top = 0
+        self.virtual = len(lines) > VIRTUAL_THRESHOLD
+
+        if self.virtual:
+            self.text.configure(yscrollcommand="")
+            self.scrollbar.configure(command=self._on_scroll)
+            self._render()
+        else:
+            # Whole report in a single insert
+            self.text.configure(yscrollcommand=self.scrollbar.set)
+            self.scrollbar.configure(command=self.text.yview)
+            self.text.delete("1.0", tk.END)
+            self.text.insert("1.0", "".join(lines))
+
+    def _visible_lines(self):
+        return int(self.text.cget("height"))
+
+    def _render(self):
+        visible = self._visible_lines()
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "".join(self.lines[self.top:self.top + visible]))
+
+        total = len(self.lines)
+        self.scrollbar.set(self.top / total, min((self.top + visible) / total, 1.0))
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.lines) - self._visible_lines()))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.lines)))
+        elif action == "scroll":
+            step = self._visible_lines() if unit == "pages" else 1
+            self._scroll_to(self.top + int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        if not self.virtual:
+            return None
+
+        if event.num == 4:
+            self._scroll_to(self.top - 3)
+        elif event.num == 5:
+            self._scroll_to(self.top + 3)
+        else:
+            self._scroll_to(self.top - 3 * int(event.delta / 120))
+        return "break"
+
+
+class VirtualGrid(tk.Frame):
+    # A fixed pool of row widgets is recycled over self.rows, so build time
+    # does not depend on how many rows the table holds. Columns are
+    # (title, width, field, editable); cells read and write getattr(row, field)
+    # and editable rows report bad input through row.is_invalid(field).
+    def __init__(self, container, columns, visible_rows=15, row_bg=None, on_edit=None, bg="#fff", **kwargs):
+        super().__init__(container, bg=bg, **kwargs)
+        self.columns = columns
+        self.visible_rows = visible_rows
+        self.row_bg = row_bg
+        self.on_edit = on_edit
+        self.bg = bg
+        self.rows = []
+        self.top = 0
+        self._loading = False
+
+        for col, (title, width, field, editable) in enumerate(columns):
+            self.grid_columnconfigure(col, weight=1)
+            tk.Label(self, text=title, bg=bg, font=("Arial", 10, "bold")).grid(row=0, column=col, padx=5)
+
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._on_scroll)
+        self.scrollbar.grid(row=1, column=len(columns), rowspan=visible_rows, sticky="ns")
+
+        self.pool = []
+        for r in range(visible_rows):
+            cells = []
+            for col, (title, width, field, editable) in enumerate(columns):
+                var = tk.StringVar(self)
+                if editable:
+                    widget = tk.Entry(self, width=width, textvariable=var)
+                    var.trace_add("write", lambda *args, r=r, col=col: self._on_write(r, col))
+                    widget.bind("<Down>", lambda e, r=r, col=col: self._move(r, col, 1))
+                    widget.bind("<Up>", lambda e, r=r, col=col: self._move(r, col, -1))
+                else:
+                    widget = tk.Label(self, width=width, textvariable=var)
+                widget.grid(row=r + 1, column=col, padx=5, pady=1)
+                widget.bind("<MouseWheel>", self._on_mousewheel)
+                widget.bind("<Button-4>", self._on_mousewheel)
+                widget.bind("<Button-5>", self._on_mousewheel)
+                cells.append((widget, var))
+            self.pool.append(cells)
+
+        self._render()
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.top = 0
+        self._render()
+
+    def _render(self):
+        self._loading = True
+        for r, cells in enumerate(self.pool):
+            index = self.top + r
+            if index < len(self.rows):
+                row = self.rows[index]
+                bg = self.row_bg(row) if self.row_bg else self.bg
+                for col, (widget, var) in enumerate(cells):
+                    var.set(getattr(row, self.columns[col][2]))
+                    widget.configure(bg=self._cell_bg(row, col, bg))
+                    widget.grid()
+            else:
+                for widget, var in cells:
+                    var.set("")
+                    widget.grid_remove()
+        self._loading = False
+
+        total = max(len(self.rows), 1)
+        self.scrollbar.set(self.top / total, min((self.top + self.visible_rows) / total, 1.0))
+
+    def _cell_bg(self, row, col, bg):
+        title, width, field, editable = self.columns[col]
+        if editable and row.is_invalid(field):
+            return "#ffcccc"
+        return bg
+
+    def _on_write(self, r, col):
+        if self._loading:
+            return
+        index = self.top + r
+        if index < len(self.rows):
+            row = self.rows[index]
+            widget, var = self.pool[r][col]
+            setattr(row, self.columns[col][2], var.get())
+            widget.configure(bg=self._cell_bg(row, col, self.row_bg(row) if self.row_bg else self.bg))
+            if self.on_edit:
+                self.on_edit(row, self.columns[col][2])
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.rows) - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _move(self, r, col, step):
+        target = r + step
+        if target < 0 or target >= self.visible_rows:
+            self._scroll_to(self.top + step)
+            target = min(max(target, 0), self.visible_rows - 1)
+        if self.top + target < len(self.rows):
+            self.pool[target][col][0].focus_set()
+        return "break"
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.rows)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll_to(self.top + int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            self._scroll_to(self.top - 3)
+        elif event.num == 5:
+            self._scroll_to(self.top + 3)
+        else:
+            self._scroll_to(self.top - 3 * int(event.delta / 120))
+        return "break"
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
-from openpyxl import Workbook
+
+from gas_model import compute_totals
 
 # ... (Keep ScrollableFrame class the same)
 
@@ -23,7 +24,7 @@ class GasCalculator:
 
         self.calculate_button = None
         self.excel_button = None
-        self.station_entries = []
+        self.stations = []
 
         for col in range(5):
             self.station_frame.scrollable_frame.grid_columnconfigure(col, weight=1)
@@ -31,39 +32,15 @@ class GasCalculator:
     # ... (Keep create_station_entries() and create_pump_table() the same)
 
     def calculate_totals(self):
-        self.results = []  # Save results to export to Excel
-        grand_essence_liters = 0
-        grand_gasoil_liters = 0
-        grand_essence_revenue = 0
-        grand_gasoil_revenue = 0
-
         result_text = ""
         try:
-            for s_index, pumps in enumerate(self.station_entries):
-                price_essence = float(self.price_entries[s_index][0].get())
-                price_gasoil = float(self.price_entries[s_index][1].get())
-                total_essence = 0
-                total_gasoil = 0
-                revenue_essence = 0
-                revenue_gasoil = 0
-                for initial_entry, final_entry, category in pumps:
-                    initial = float(initial_entry.get())
-                    final = float(final_entry.get())
-                    liters = final - initial
-                    if category == "Essence":
-                        total_essence += liters
-                        revenue_essence += liters * price_essence
-                    else:
-                        total_gasoil += liters
-                        revenue_gasoil += liters * price_gasoil
-                grand_essence_liters += total_essence
-                grand_gasoil_liters += total_gasoil
-                grand_essence_revenue += revenue_essence
-                grand_gasoil_revenue += revenue_gasoil
-                result_text += (f"Station {s_index+1}:\n"
+            # Values were parsed as they were typed; nothing is read back from the widgets
+            self.results, _, grand = compute_totals(self.stations, exact=True)  # Save results to export to Excel
+            grand_essence_liters, grand_essence_revenue, grand_gasoil_liters, grand_gasoil_revenue = grand
+            for name, total_essence, revenue_essence, total_gasoil, revenue_gasoil in self.results:
+                result_text += (f"{name}:\n"
                                 f"  Essence: {total_essence} L, Chiffre d'affaires: {revenue_essence} DH\n"
                                 f"  Gasoil: {total_gasoil} L, Chiffre d'affaires: {revenue_gasoil} DH\n\n")
-                self.results.append([f"Station {s_index+1}", total_essence, revenue_essence, total_gasoil, revenue_gasoil])
 
             result_text += (f"Totaux Généraux:\n"
                             f"  Essence: {grand_essence_liters} L, Chiffre d'affaires: {grand_essence_revenue} DH\n"
@@ -77,13 +54,15 @@ class GasCalculator:
                                               command=self.export_to_excel, bg="#4CAF50", fg="white")
                 self.excel_button.grid(row=4, column=0, columnspan=5, pady=10)
 
-        except ValueError:
-            messagebox.showerror("Erreur", "Remplissez tous les champs avec des nombres valides")
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Remplissez tous les champs avec des nombres valides\n{e}")
 
     def export_to_excel(self):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Stations"
+        # Loaded on first export, not at startup
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Stations")
         ws.append(["Station", "Essence (L)", "Chiffre d'affaires Essence (DH)", "Gasoil (L)", "Chiffre d'affaires Gasoil (DH)"])
 
         for row in self.results:
@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox
 from datetime import datetime
-import os
-from openpyxl import Workbook
+
+from gas_reconcile import connect_archive, add_day, mismatch_line
+from gas_export import report_folder, report_filename, ExportJob, ExportCancelled, EXPORTERS
+from gas_model import build_stations, compute_totals, Network
+from gas_trace import stage, enable_from
+from gas_widgets import VirtualGrid
 
 class ScrollableFrame(tk.Frame):
     def __init__(self, container, *args, **kwargs):
@@ -71,7 +75,9 @@ class GasCalculator:
         self.station_frame.grid(row=2, column=0, columnspan=5, sticky="nsew", pady=10, padx=10)
 
         self.calculate_button = None
-        self.station_entries = []
+        self.live_totals = tk.Label(root, font=("Arial", 11), bg="#e0e0e0")
+        self.live_totals.grid(row=5, column=0, columnspan=5, pady=5)
+        self.stations = []
 
         # Make scrollable frame columns expandable
         for col in range(5):
@@ -80,7 +86,7 @@ class GasCalculator:
     def create_station_entries(self):
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
-        self.station_entries = []
+        self.stations = []
 
         try:
             self.num_stations = int(self.num_stations_entry.get())
@@ -142,110 +148,78 @@ class GasCalculator:
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
 
-        self.station_entries = []
-        self.price_entries = []
+        # Widget build, timed when tracing is on
+        with stage("create_pump_table", rows=sum(map(sum, self.station_pumps))):
+            # The grids are views over the headless station model
+            self.stations = build_stations(self.station_pumps)
+            self.network = Network(self.stations, on_change=self.show_live_totals)
 
-        for s_index, (essence_pumps, gasoil_pumps) in enumerate(self.station_pumps):
-            frame = tk.Frame(
-                self.station_frame.scrollable_frame, bd=2, relief="groove", padx=5, pady=5, bg="#fff"
+            self.price_grid = VirtualGrid(
+                self.station_frame.scrollable_frame,
+                [
+                    ("Station", 12, "name", False),
+                    ("Prix par litre Essence (DH)", 10, "price_essence_text", True),
+                    ("Prix par litre Gasoil (DH)", 10, "price_gasoil_text", True),
+                ],
+                visible_rows=5,
+                bd=2,
+                relief="groove",
+                padx=5,
+                pady=5,
             )
-            frame.grid(row=s_index, column=0, pady=5, sticky="ew")
+            self.price_grid.grid(row=0, column=0, pady=5, sticky="ew")
+            self.price_grid.set_rows(self.stations)
 
-            for col in range(4):
-                frame.grid_columnconfigure(col, weight=1)
-
-            tk.Label(frame, text=f"Station {s_index+1}", font=("Arial", 12, "bold"), bg="#fff").grid(
-                row=0, column=0, columnspan=4, pady=2
+            self.pump_grid = VirtualGrid(
+                self.station_frame.scrollable_frame,
+                [
+                    ("Station", 12, "station_name", False),
+                    ("Pompe #", 8, "number", False),
+                    ("Initial", 10, "initial_text", True),
+                    ("Final", 10, "final_text", True),
+                    ("Catégorie", 10, "category", False),
+                ],
+                visible_rows=12,
+                row_bg=lambda pump: "#f9f9f9" if pump.category == "Essence" else "#e6f2ff",
+                bd=2,
+                relief="groove",
+                padx=5,
+                pady=5,
             )
-            tk.Label(frame, text="Prix par litre Essence (DH) :", bg="#fff").grid(row=1, column=0, sticky="w", padx=5)
-            price_essence = tk.Entry(frame, width=10)
-            price_essence.grid(row=1, column=1, sticky="w", padx=5)
-            tk.Label(frame, text="Prix par litre Gasoil (DH) :", bg="#fff").grid(row=1, column=2, sticky="w", padx=5)
-            price_gasoil = tk.Entry(frame, width=10)
-            price_gasoil.grid(row=1, column=3, sticky="w", padx=5)
-            self.price_entries.append((price_essence, price_gasoil))
-
-            pumps_entries = []
-
-            tk.Label(frame, text="Pompe #", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=0)
-            tk.Label(frame, text="Initial", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=1)
-            tk.Label(frame, text="Final", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=2)
-            tk.Label(frame, text="Catégorie", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=3)
-
-            r = 3
-            for p in range(essence_pumps):
-                tk.Label(frame, text=f"{p+1}", bg="#f9f9f9").grid(row=r, column=0)
-                initial = tk.Entry(frame, width=10, bg="#f9f9f9")
-                initial.grid(row=r, column=1)
-                final = tk.Entry(frame, width=10, bg="#f9f9f9")
-                final.grid(row=r, column=2)
-                tk.Label(frame, text="Essence", bg="#f9f9f9").grid(row=r, column=3)
-                pumps_entries.append((initial, final, "Essence"))
-                r += 1
-            for p in range(gasoil_pumps):
-                tk.Label(frame, text=f"{p+1}", bg="#e6f2ff").grid(row=r, column=0)
-                initial = tk.Entry(frame, width=10, bg="#e6f2ff")
-                initial.grid(row=r, column=1)
-                final = tk.Entry(frame, width=10, bg="#e6f2ff")
-                final.grid(row=r, column=2)
-                tk.Label(frame, text="Gasoil", bg="#e6f2ff").grid(row=r, column=3)
-                pumps_entries.append((initial, final, "Gasoil"))
-                r += 1
-            self.station_entries.append(pumps_entries)
-
-        if self.calculate_button:
-            self.calculate_button.destroy()
-        self.calculate_button = tk.Button(
-            self.root,
-            text="Calculer Totaux",
-            font=("Arial", 12),
-            command=self.calculate_totals,
-            bg="#FF5722",
-            fg="white",
+            self.pump_grid.grid(row=1, column=0, pady=5, sticky="ew")
+            self.pump_grid.set_rows([pump for station in self.stations for pump in station.pumps])
+
+            if self.calculate_button:
+                self.calculate_button.destroy()
+            self.calculate_button = tk.Button(
+                self.root,
+                text="Calculer Totaux",
+                font=("Arial", 12),
+                command=self.calculate_totals,
+                bg="#FF5722",
+                fg="white",
+            )
+            self.calculate_button.grid(row=3, column=0, columnspan=5, pady=10)
+            self.show_live_totals(self.network)
+
+    # Running totals, updated on every edit
+    def show_live_totals(self, network):
+        text = (
+            f"Essence: {network.liters_essence:.2f} L, {network.revenue_essence:.2f} DH   "
+            f"Gasoil: {network.liters_gasoil:.2f} L, {network.revenue_gasoil:.2f} DH"
         )
-        self.calculate_button.grid(row=3, column=0, columnspan=5, pady=10)
+        if network.missing:
+            text += f"   ({network.missing} pompes incomplètes)"
+        self.live_totals.config(text=text)
 
     def calculate_totals(self):
-        grand_essence_liters = 0
-        grand_gasoil_liters = 0
-        grand_essence_revenue = 0
-        grand_gasoil_revenue = 0
-
-        self.results = []
-        self.detailed_results = []
-
         try:
-            for s_index, pumps in enumerate(self.station_entries):
-                price_essence = float(self.price_entries[s_index][0].get())
-                price_gasoil = float(self.price_entries[s_index][1].get())
-                total_essence = 0
-                total_gasoil = 0
-                revenue_essence = 0
-                revenue_gasoil = 0
-                for initial_entry, final_entry, category in pumps:
-                    initial = float(initial_entry.get())
-                    final = float(final_entry.get())
-                    liters = final - initial
-                    if category == "Essence":
-                        total_essence += liters
-                        revenue_essence += liters * price_essence
-                    else:
-                        total_gasoil += liters
-                        revenue_gasoil += liters * price_gasoil
-                    self.detailed_results.append([f"Station {s_index+1}", initial, final, liters, category])
-
-                grand_essence_liters += total_essence
-                grand_gasoil_liters += total_gasoil
-                grand_essence_revenue += revenue_essence
-                grand_gasoil_revenue += revenue_gasoil
-
-                self.results.append([
-                    f"Station {s_index+1}",
-                    total_essence,
-                    revenue_essence,
-                    total_gasoil,
-                    revenue_gasoil
-                ])
+            # Values were parsed as they were typed; nothing is read back from the widgets
+            with stage("calculate_totals") as info:
+                # Summed in centilitres and millimes, rounded once to the centime
+                self.results, self.detailed_results, grand = compute_totals(self.stations, exact=True)
+                info["rows"] = len(self.detailed_results)
+            grand_essence_liters, grand_essence_revenue, grand_gasoil_liters, grand_gasoil_revenue = grand
 
             result_text = ""
             for row in self.results:
@@ -272,40 +246,69 @@ class GasCalculator:
                     bg="#9C27B0",
                     fg="white",
                 )
-                self.export_button.grid(row=4, column=0, columnspan=5, pady=10)
+                self.export_button.grid(row=4, column=0, columnspan=4, pady=10)
 
-        except ValueError:
-            messagebox.showerror("Erreur", "Remplissez tous les champs avec des nombres valides")
+                # xlsx by default; csv/parquet/arrow are faster to write and to reload
+                self.export_format = tk.StringVar(self.root, value="xlsx")
+                tk.OptionMenu(self.root, self.export_format, *EXPORTERS).grid(row=4, column=4, pady=10)
+
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Remplissez tous les champs avec des nombres valides\n{e}")
 
     def export_to_excel(self):
-        # Dynamic folder path (works on any laptop)
-        folder_path = os.path.join(os.path.expanduser("~"), "Documents", "GasReports")
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-
-        wb = Workbook()
-        ws1 = wb.active
-        ws1.title = "Stations Totaux"
-        ws1.append(["Station", "Essence (L)", "Chiffre d'affaires Essence (DH)", "Gasoil (L)", "Chiffre d'affaires Gasoil (DH)"])
-        for row in self.results:
-            ws1.append(row)
-
-        ws2 = wb.create_sheet("Pompes Détails")
-        ws2.append(["Station", "Initial", "Final", "Litres", "Catégorie"])
-        for row in self.detailed_results:
-            ws2.append(row)
-
-        today = datetime.now().strftime("%Y-%m-%d")
-        filename = os.path.join(folder_path, f"Gas_Station_Report_{today}.xlsx")
+        fmt = self.export_format.get()
+        self.export_date = datetime.now().strftime("%Y-%m-%d")
+        filename = report_filename(report_folder(), self.export_date, fmt)
+
+        # wb.save runs on a worker thread; _poll_export follows it from the Tk loop
+        self.export_job = ExportJob(filename, self.results, self.detailed_results, EXPORTERS[fmt])
+        self.export_job.start()
+        self.export_button.config(text="Annuler l'export", command=self.cancel_export)
+        self.root.after(100, self._poll_export)
+
+    def cancel_export(self):
+        self.export_job.cancel()
+
+    def _poll_export(self):
+        job = self.export_job
+        if not job.done:
+            self.export_button.config(text=f"Annuler l'export ({job.percent}%)")
+            self.root.after(100, self._poll_export)
+            return
 
+        self.export_button.config(text="Exporter vers Excel", command=self.export_to_excel)
+        if isinstance(job.error, ExportCancelled):
+            messagebox.showinfo("Annulé", "L'export a été annulé.")
+        elif job.error:
+            messagebox.showerror("Erreur", f"Impossible de sauvegarder le fichier Excel:\n{job.error}")
+        else:
+            filenames = "\n".join(job.filenames)
+            messagebox.showinfo("Succès", f"Les résultats ont été exportés vers:\n{filenames}")
+            self.save_to_database(job.detailed_results, job.filename if job.filename.endswith(".xlsx") else None)
+
+    def save_to_database(self, detailed_results, report_path=None):
+        # Keep the "Pompes Détails" rows queryable by station and period, and
+        # check today's initial readings against the previous report's finals.
+        # detailed_results are the exported rows: "Calculer Totaux" may have
+        # replaced self.detailed_results while the export ran
         try:
-            wb.save(filename)
-            messagebox.showinfo("Succès", f"Les résultats ont été exportés vers:\n{filename}")
+            conn = connect_archive()
+            try:
+                mismatches = add_day(conn, self.export_date, detailed_results, report_path)
+            finally:
+                conn.close()
         except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de sauvegarder le fichier Excel:\n{e}")
+            messagebox.showerror("Erreur", f"Impossible d'enregistrer les relevés dans la base:\n{e}")
+            return
+
+        if mismatches:
+            lines = "\n".join(mismatch_line(mismatch) for mismatch in mismatches[:20])
+            more = f"\n... et {len(mismatches) - 20} autres" if len(mismatches) > 20 else ""
+            messagebox.showwarning("Écarts de relevés", f"{len(mismatches)} relevés ne suivent pas le rapport précédent:\n{lines}{more}")
 
 
 if __name__ == "__main__":
+    enable_from()
     root = tk.Tk()
     app = GasCalculator(root)
     root.mainloop()
@@ -1,6 +1,20 @@
+import multiprocessing
+import os
 import tkinter as tk
+from functools import partial
 from tkinter import ttk, messagebox, filedialog
-import openpyxl
+from gas_cache import ParseCache
+from gas_incremental import IncrementalImporter
+from gas_engine import (aggregate_columns, aggregate_categories, pumped_volume, ExcelReport, READERS, EXCEL_EXTENSIONS, sheet_names, list_sources,
+                        read_sources, load_column_mapping)
+from gas_export import report_folder
+from gas_trace import stage, enable_from
+from gas_widgets import VirtualText
+
+FILETYPES = [
+    ("All supported", " ".join(f"*{ext}" for ext in READERS)),
+    ("Excel Files", " ".join(f"*{ext}" for ext in EXCEL_EXTENSIONS)),
+]
 
 class GasAppExcel:
     def __init__(self, root):
@@ -12,87 +26,142 @@ class GasAppExcel:
 
         # Import Button
         ttk.Button(root, text="Import Excel File", command=self.import_excel).pack(pady=10)
+        ttk.Button(root, text="Import Several Files / Sheets", command=self.import_many).pack()
 
         # Result Box
-        self.results = tk.Text(root, height=20, width=80)
+        self.results = VirtualText(root, height=20, width=80)
         self.results.pack(pady=10)
 
+        # Extra header names for the columns can be listed in GasReports/columns.json
+        mapping_path = os.path.join(report_folder(), "columns.json")
+        self.mapping = None
+        if os.path.exists(mapping_path):
+            try:
+                self.mapping = load_column_mapping(mapping_path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Could not read {mapping_path}:\n{e}")
+
+        # Re-imports only aggregate rows appended since the last import; an
+        # unchanged workbook is served from the parse cache
+        reader = partial(ParseCache().read_columns, mapping=self.mapping)
+        self.importer = IncrementalImporter(reader=reader, mapping=self.mapping)
+
 
     def import_excel(self):
-        file_path = filedialog.askopenfilename(
-            title="Select Excel File",
-            filetypes=[("Excel Files", "*.xlsx *.xlsm *.xltx *.xltm")]
-        )
+        file_path = filedialog.askopenfilename(title="Select Excel File", filetypes=FILETYPES)
 
         if not file_path:
             messagebox.showwarning("No file selected", "Please select an Excel file to import.")
             return
 
         try:
-            wb = openpyxl.load_workbook(file_path, data_only=True)
-            sheet = wb.active
-
-            data = []
-
-            for row in sheet.iter_rows(min_row=2, values_only=True):
+            # Rows are streamed straight into contiguous column arrays
+            with stage("import_excel") as info:
+                data, station_totals, grand_total, _ = self.importer.import_file(file_path)
+                info["rows"] = len(data["station"])
+            self.calculate_from_excel(data, (station_totals, grand_total))
+            self.warn_skipped(data)
 
-                if not row or row[0] is None:
-                    continue
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not read Excel file:\n{e}")
 
-                # Only read first 4 columns
-                station, pump, initial, final = row[:4]
 
-                if station is None or pump is None or initial is None or final is None:
-                    continue
+    def import_many(self):
+        file_paths = filedialog.askopenfilenames(title="Select Excel Files", filetypes=FILETYPES)
 
-                data.append({
-                    "station": int(station),
-                    "pump": int(pump),
-                    "initial": float(initial),
-                    "final": float(final),
-                })
+        if not file_paths:
+            messagebox.showwarning("No file selected", "Please select at least one file to import.")
+            return
 
+        try:
+            names = {}
+            for file_path in file_paths:
+                if os.path.splitext(file_path)[1].lower() in EXCEL_EXTENSIONS:
+                    names.update(dict.fromkeys(sheet_names(file_path)))
+
+            sheets = None
+            if len(names) > 1:
+                sheets = self.choose_sheets(list(names))
+                if not sheets:
+                    return
+
+            # Every selected sheet of every file is parsed (in parallel when
+            # there are several) and merged into one result
+            with stage("import_many") as info:
+                data = read_sources(list_sources(file_paths, sheets), os.cpu_count() or 1, self.mapping)
+                info["rows"] = len(data["station"])
             self.calculate_from_excel(data)
+            self.warn_skipped(data)
 
         except Exception as e:
-            messagebox.showerror("Error", f"Could not read Excel file:\n{e}")
-
+            messagebox.showerror("Error", f"Could not read Excel files:\n{e}")
 
-    # -----------------------------------------------------
-    # A MUST HAVE FUNCTION 
-    # -----------------------------------------------------
-    def calculate_from_excel(self, data):
-        self.results.delete("1.0", tk.END)
 
-        station_totals = {}
-        grand_total = 0
+    def choose_sheets(self, names):
+        # Modal list of the sheet names found, all selected to start with
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Select Sheets")
+        dialog.transient(self.root)
 
-        for row in data:
-            station = row["station"]
-            pump = row["pump"]
-            pumped = row["final"] - row["initial"]
+        listbox = tk.Listbox(dialog, selectmode=tk.MULTIPLE, height=min(len(names), 15), exportselection=False)
+        for name in names:
+            listbox.insert(tk.END, name)
+        listbox.selection_set(0, tk.END)
+        listbox.pack(padx=10, pady=10, fill="both", expand=True)
 
-            if station not in station_totals:
-                station_totals[station] = 0
+        chosen = []
 
-            station_totals[station] += pumped
-            grand_total += pumped
+        def confirm():
+            chosen.extend(names[i] for i in listbox.curselection())
+            dialog.destroy()
 
-            self.results.insert(
-                tk.END,
-                f"Station {station} - Pump {pump}: {pumped} liters\n"
-            )
+        ttk.Button(dialog, text="Import", command=confirm).pack(side="left", padx=10, pady=(0, 10))
+        ttk.Button(dialog, text="Cancel", command=dialog.destroy).pack(side="right", padx=10, pady=(0, 10))
 
-        self.results.insert(tk.END, "\n==============================\n")
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return chosen
 
-        for station, total in station_totals.items():
-            self.results.insert(tk.END, f"Total for Station {station}: {total} liters\n")
 
-        self.results.insert(tk.END, "==============================\n")
-        self.results.insert(tk.END, f"Grand Total: {grand_total} liters\n")
-        self.results.insert(tk.END, "==============================\n")
+    def warn_skipped(self, data):
+        errors = data["errors"]
+        if len(errors):
+            counted = int(errors["kept"].sum())
+            text = f"{len(errors)} problems found; the rows concerned are listed at the end of the report."
+            if counted:
+                text += f"\n{counted} meter rollover(s) are still counted in the totals."
+            messagebox.showwarning("Rows skipped", text)
 
 
-root = tk.Tk()
-app = GasAppExcel(root)
-root.mainloop()
+    # -----------------------------------------------------
+    # A MUST HAVE FUNCTION 
+    # -----------------------------------------------------
+    def calculate_from_excel(self, data, totals=None):
+        with stage("calculate_from_excel", rows=len(data["station"])):
+            if totals is None:
+                pumped, station_totals, grand_total = aggregate_columns(data)
+            else:
+                pumped = pumped_volume(data)
+                station_totals, grand_total = totals
+
+            # With a category column, the Essence/Gasoil litres and revenue of the
+            # manual calculator come from the same grouped pass
+            categories = None
+            if "category" in data:
+                try:
+                    categories = aggregate_categories(data, exact=True)
+                except ValueError as e:
+                    messagebox.showwarning("Revenue", f"Revenue not computed:\n{e}")
+
+        # Report is built in one buffer; large ones are shown through a virtual view
+        with stage("report", rows=len(data["station"])):
+            self.results.set_lines(ExcelReport(data, pumped, station_totals, grand_total, categories))
+
+
+if __name__ == "__main__":
+    # Sheets are parsed in worker processes, which a frozen build must support
+    multiprocessing.freeze_support()
+    enable_from()
+    root = tk.Tk()
+    app = GasAppExcel(root)
+    root.mainloop()
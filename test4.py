@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox
 
+from gas_model import build_stations, compute_totals, Network
+from gas_widgets import VirtualGrid
+
 class ScrollableFrame(tk.Frame):
     def __init__(self, container, *args, **kwargs):
         super().__init__(container, *args, **kwargs)
@@ -51,7 +54,9 @@ class GasCalculator:
         self.station_frame.grid(row=2, column=0, columnspan=5, sticky="nsew", pady=10, padx=10)
 
         self.calculate_button = None
-        self.station_entries = []
+        self.live_totals = tk.Label(root, font=("Arial", 11), bg="#e0e0e0")
+        self.live_totals.grid(row=5, column=0, columnspan=5, pady=5)
+        self.stations = []
 
         # Make scrollable frame columns expandable
         for col in range(5):
@@ -60,7 +65,7 @@ class GasCalculator:
     def create_station_entries(self):
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
-        self.station_entries = []
+        self.stations = []
 
         try:
             self.num_stations = int(self.num_stations_entry.get())
@@ -101,99 +106,56 @@ class GasCalculator:
         for widget in self.station_frame.scrollable_frame.winfo_children():
             widget.destroy()
 
-        self.station_entries = []
-        self.price_entries = []
-
-        for s_index, (essence_pumps, gasoil_pumps) in enumerate(self.station_pumps):
-            frame = tk.Frame(self.station_frame.scrollable_frame, bd=2, relief="groove", padx=5, pady=5, bg="#fff")
-            frame.grid(row=s_index, column=0, pady=5, sticky="ew")
-
-            # Make columns expandable
-            for col in range(4):
-                frame.grid_columnconfigure(col, weight=1)
-
-            tk.Label(frame, text=f"Station {s_index+1}", font=("Arial", 12, "bold"), bg="#fff").grid(row=0, column=0, columnspan=4, pady=2)
-            tk.Label(frame, text="Prix par litre Essence:", bg="#fff").grid(row=1, column=0, sticky="w", padx=5)
-            price_essence = tk.Entry(frame, width=12)
-            price_essence.grid(row=1, column=1, sticky="w", padx=5)
-            tk.Label(frame, text="Prix par litre Gasoil:", bg="#fff").grid(row=1, column=2, sticky="w", padx=5)
-            price_gasoil = tk.Entry(frame, width=12)
-            price_gasoil.grid(row=1, column=3, sticky="w", padx=5)
-            self.price_entries.append((price_essence, price_gasoil))
-
-            pumps_entries = []
-
-            # Column headers
-            tk.Label(frame, text="N° Pompe", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=0)
-            tk.Label(frame, text="Initial", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=1)
-            tk.Label(frame, text="Final", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=2)
-            tk.Label(frame, text="Catégorie", bg="#fff", font=("Arial", 10, "bold")).grid(row=2, column=3)
-
-            r = 3
-            for p in range(essence_pumps):
-                tk.Label(frame, text=f"{p+1}", bg="#f9f9f9").grid(row=r, column=0)
-                initial = tk.Entry(frame, width=12, bg="#f9f9f9")
-                initial.grid(row=r, column=1)
-                final = tk.Entry(frame, width=12, bg="#f9f9f9")
-                final.grid(row=r, column=2)
-                tk.Label(frame, text="Essence", bg="#f9f9f9").grid(row=r, column=3)
-                pumps_entries.append((initial, final, "Essence"))
-                r += 1
-            for p in range(gasoil_pumps):
-                tk.Label(frame, text=f"{p+1}", bg="#e6f2ff").grid(row=r, column=0)
-                initial = tk.Entry(frame, width=12, bg="#e6f2ff")
-                initial.grid(row=r, column=1)
-                final = tk.Entry(frame, width=12, bg="#e6f2ff")
-                final.grid(row=r, column=2)
-                tk.Label(frame, text="Gasoil", bg="#e6f2ff").grid(row=r, column=3)
-                pumps_entries.append((initial, final, "Gasoil"))
-                r += 1
-            self.station_entries.append(pumps_entries)
+        # The grids are views over the headless station model
+        self.stations = build_stations(self.station_pumps)
+        self.network = Network(self.stations, on_change=self.show_live_totals)
+
+        self.price_grid = VirtualGrid(self.station_frame.scrollable_frame,
+                                      [("Station", 12, "name", False), ("Prix par litre Essence", 12, "price_essence_text", True), ("Prix par litre Gasoil", 12, "price_gasoil_text", True)],
+                                      visible_rows=5, bd=2, relief="groove", padx=5, pady=5)
+        self.price_grid.grid(row=0, column=0, pady=5, sticky="ew")
+        self.price_grid.set_rows(self.stations)
+
+        self.pump_grid = VirtualGrid(self.station_frame.scrollable_frame,
+                                     [("Station", 12, "station_name", False), ("N° Pompe", 8, "number", False), ("Initial", 12, "initial_text", True), ("Final", 12, "final_text", True), ("Catégorie", 10, "category", False)],
+                                     visible_rows=12, row_bg=lambda pump: "#f9f9f9" if pump.category == "Essence" else "#e6f2ff",
+                                     bd=2, relief="groove", padx=5, pady=5)
+        self.pump_grid.grid(row=1, column=0, pady=5, sticky="ew")
+        self.pump_grid.set_rows([pump for station in self.stations for pump in station.pumps])
 
         if self.calculate_button:
             self.calculate_button.destroy()
         self.calculate_button = tk.Button(self.root, text="Calculer Totaux", font=("Arial", 12),
                                           command=self.calculate_totals, bg="#FF5722", fg="white")
         self.calculate_button.grid(row=3, column=0, columnspan=5, pady=10)
+        self.show_live_totals(self.network)
+
+    # Running totals, updated on every edit
+    def show_live_totals(self, network):
+        text = (
+            f"Essence: {network.liters_essence:.2f} L, {network.revenue_essence:.2f} DH   "
+            f"Gasoil: {network.liters_gasoil:.2f} L, {network.revenue_gasoil:.2f} DH"
+        )
+        if network.missing:
+            text += f"   ({network.missing} pompes incomplètes)"
+        self.live_totals.config(text=text)
 
     def calculate_totals(self):
-        grand_essence_liters = 0
-        grand_gasoil_liters = 0
-        grand_essence_revenue = 0
-        grand_gasoil_revenue = 0
-
         result_text = ""
         try:
-            for s_index, pumps in enumerate(self.station_entries):
-                price_essence = float(self.price_entries[s_index][0].get())
-                price_gasoil = float(self.price_entries[s_index][1].get())
-                total_essence = 0
-                total_gasoil = 0
-                revenue_essence = 0
-                revenue_gasoil = 0
-                for initial_entry, final_entry, category in pumps:
-                    initial = float(initial_entry.get())
-                    final = float(final_entry.get())
-                    liters = final - initial
-                    if category == "Essence":
-                        total_essence += liters
-                        revenue_essence += liters * price_essence
-                    else:
-                        total_gasoil += liters
-                        revenue_gasoil += liters * price_gasoil
-                grand_essence_liters += total_essence
-                grand_gasoil_liters += total_gasoil
-                grand_essence_revenue += revenue_essence
-                grand_gasoil_revenue += revenue_gasoil
-                result_text += (f"Station {s_index+1}:\n"
+            # Values were parsed as they were typed; nothing is read back from the widgets
+            results, _, grand = compute_totals(self.stations, exact=True)
+            grand_essence_liters, grand_essence_revenue, grand_gasoil_liters, grand_gasoil_revenue = grand
+            for name, total_essence, revenue_essence, total_gasoil, revenue_gasoil in results:
+                result_text += (f"{name}:\n"
                                 f"  Essence: {total_essence} L, Chiffre d'affaires: {revenue_essence} DH\n"
                                 f"  Gasoil: {total_gasoil} L, Chiffre d'affaires: {revenue_gasoil} DH\n\n")
             result_text += (f"Totaux Généraux:\n"
                             f"  Essence: {grand_essence_liters} L, Chiffre d'affaires: {grand_essence_revenue} DH\n"
                             f"  Gasoil: {grand_gasoil_liters} L, Chiffre d'affaires: {grand_gasoil_revenue} DH")
             messagebox.showinfo("Totaux", result_text)
-        except ValueError:
-            messagebox.showerror("Erreur", "Remplissez tous les champs avec des nombres valides")
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Remplissez tous les champs avec des nombres valides\n{e}")
 
 if __name__ == "__main__":
     root = tk.Tk()
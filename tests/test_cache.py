@@ -0,0 +1,46 @@
+import os
+
+import gas_cache
+from gas_cache import ParseCache
+from gas_engine import read_columns
+
+HEADER = "Station,Pompe,Index initial,Index final\n"
+
+
+class CountingReader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path, mapping=None):
+        self.calls += 1
+        return read_columns(path, mapping)
+
+
+def meter_log(tmp_path):
+    path = str(tmp_path / "meters.csv")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER + "1,1,10,20\n2,1,5,8\n")
+    return path
+
+
+def test_unchanged_file_is_parsed_once(tmp_path):
+    path = meter_log(tmp_path)
+    reader = CountingReader()
+    for _ in range(2):
+        columns = ParseCache(str(tmp_path / "cache")).read_columns(path, reader)
+    assert reader.calls == 1
+    assert columns["final"].tolist() == [20.0, 8.0]
+
+
+def test_entries_of_another_version_are_not_served(tmp_path, monkeypatch):
+    path = meter_log(tmp_path)
+    folder = str(tmp_path / "cache")
+    reader = CountingReader()
+    ParseCache(folder).read_columns(path, reader)
+
+    # The old entry stays on disk next to an index of the new version
+    monkeypatch.setattr(gas_cache, "CACHE_VERSION", gas_cache.CACHE_VERSION + 1)
+    os.remove(os.path.join(folder, "index.json"))
+    ParseCache(folder).read_columns(path, reader)
+    assert reader.calls == 2
+    assert len([name for name in os.listdir(folder) if name.endswith(".npz")]) == 1
@@ -0,0 +1,140 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+from gas_engine import aggregate_categories, aggregate_columns, validate_columns
+from gas_model import build_stations, compute_totals, round_money
+
+CENTIME = Decimal("0.01")
+
+
+def filled_stations(n_stations, seed=0):
+    rnd = random.Random(seed)
+    stations = build_stations([(3, 2)] * n_stations)
+    for station in stations:
+        station.price_essence_text = f"{rnd.uniform(12, 15):.2f}"
+        station.price_gasoil_text = f"{rnd.uniform(10, 13):.3f}"
+        for pump in station.pumps:
+            initial = rnd.uniform(0, 100000)
+            pump.initial_text = f"{initial:.2f}"
+            pump.final_text = f"{initial + rnd.uniform(0, 500):.2f}"
+    return stations
+
+
+def decimal_totals(stations):
+    # Station rows and grand totals worked out in Decimal from the typed text,
+    # rounded once at the end
+    rows = []
+    grand = [Decimal(0)] * 4
+    for station in stations:
+        totals = [Decimal(0)] * 4
+        for pump in station.pumps:
+            liters = Decimal(pump.final_text) - Decimal(pump.initial_text)
+            if pump.category == "Essence":
+                totals[0] += liters
+                totals[1] += liters * Decimal(station.price_essence_text)
+            else:
+                totals[2] += liters
+                totals[3] += liters * Decimal(station.price_gasoil_text)
+        grand = [g + t for g, t in zip(grand, totals)]
+        rows.append([station.name, *rounded(totals)])
+    return rows, rounded(grand)
+
+
+def rounded(totals):
+    return [float(value.quantize(CENTIME, ROUND_HALF_UP)) for value in totals]
+
+
+def station_columns(stations):
+    # The same readings as an import would hand them to aggregate_categories
+    pumps = [pump for station in stations for pump in station.pumps]
+    raw = {
+        "station": np.array([pump.station.number for pump in pumps], dtype=np.float64),
+        "pump": np.array([pump.number for pump in pumps], dtype=np.float64),
+        "initial": np.array([float(pump.initial_text) for pump in pumps]),
+        "final": np.array([float(pump.final_text) for pump in pumps]),
+        "category": np.array([pump.category for pump in pumps], dtype=object),
+        "price": np.array([
+            float(pump.station.price_essence_text if pump.category == "Essence" else pump.station.price_gasoil_text)
+            for pump in pumps
+        ]),
+    }
+    return validate_columns(raw)
+
+
+def test_model_matches_decimal_reference():
+    stations = filled_stations(200)
+    results, _, grand = compute_totals(stations, exact=True)
+    assert (results, grand) == decimal_totals(stations)
+
+
+def test_columns_match_decimal_reference():
+    stations = filled_stations(200)
+    columns = station_columns(stations)
+    assert len(columns["errors"]) == 0
+    assert aggregate_categories(columns, exact=True) == decimal_totals(stations)
+
+
+def test_revenue_ties_round_half_up_in_both_paths():
+    # 0.01 L at 0.500 DH is 0.005 DH: half up gives 0.01
+    stations = build_stations([(1, 0)])
+    stations[0].price_essence_text = "0.500"
+    stations[0].pumps[0].initial_text = "100.00"
+    stations[0].pumps[0].final_text = "100.01"
+    expected = decimal_totals(stations)
+    assert expected[1][1] == 0.01
+    assert compute_totals(stations, exact=True)[::2] == expected
+    assert aggregate_categories(station_columns(stations), exact=True) == expected
+
+
+def test_litres_without_price_column():
+    # Revenue is left out, the per-category litres are still summed
+    stations = filled_stations(20)
+    columns = station_columns(stations)
+    del columns["price"]
+    results, grand = aggregate_categories(columns, exact=True)
+    expected_results, expected_grand = decimal_totals(stations)
+    assert results == [[name, le, None, lg, None] for name, le, _, lg, _ in expected_results]
+    assert grand == [expected_grand[0], None, expected_grand[2], None]
+
+
+def test_extra_decimals_are_flagged_not_rounded():
+    stations = build_stations([(1, 0)])
+    stations[0].price_essence_text = "10"
+    pump = stations[0].pumps[0]
+    pump.initial_text = "100.005"
+    pump.final_text = "100.020"
+    assert pump.is_invalid("initial_text")
+    with pytest.raises(ValueError, match="décimales"):
+        compute_totals(stations, exact=True)
+
+    # The import keeps the row for the litre totals; only the exact revenue refuses it
+    columns = station_columns(stations)
+    assert len(columns["errors"]) == 0
+    assert aggregate_columns(columns)[2] == pytest.approx(0.015)
+    with pytest.raises(ValueError, match="relevé avec plus de 2 décimales pour la pompe 1"):
+        aggregate_categories(columns, exact=True)
+
+
+def test_extra_price_decimals_are_flagged():
+    stations = build_stations([(1, 0)])
+    stations[0].price_essence_text = "12.3456"
+    stations[0].pumps[0].initial_text = "1"
+    stations[0].pumps[0].final_text = "2"
+    assert stations[0].is_invalid("price_essence_text")
+    with pytest.raises(ValueError, match="prix Essence avec plus de 3 décimales"):
+        compute_totals(stations, exact=True)
+
+    columns = station_columns(stations)
+    assert aggregate_columns(columns)[2] == 1.0
+    with pytest.raises(ValueError, match="Station 1: prix Essence avec plus de 3 décimales"):
+        aggregate_categories(columns, exact=True)
+
+
+def test_round_money_is_symmetric():
+    # centilitres x millimes: 500 units is half a centime
+    assert round_money(500) == 0.01
+    assert round_money(499) == 0.0
+    assert round_money(-500) == -0.01
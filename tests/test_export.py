@@ -0,0 +1,37 @@
+import os
+import stat
+
+import pytest
+
+from gas_export import EXPORTERS, save_report
+
+
+@pytest.fixture
+def umask_022():
+    old = os.umask(0o022)
+    yield
+    os.umask(old)
+
+
+@pytest.mark.parametrize("fmt", sorted(EXPORTERS))
+def test_reports_are_readable_by_others(tmp_path, umask_022, fmt):
+    filenames = EXPORTERS[fmt](str(tmp_path / f"report.{fmt}"), [["Station 1", 10.0, 100.0, 0, 0]],
+                               [["Station 1", 1.0, 11.0, 10.0, "Essence"]])
+    for filename in filenames or [str(tmp_path / f"report.{fmt}")]:
+        assert stat.S_IMODE(os.stat(filename).st_mode) == 0o644
+    assert not [name for name in os.listdir(tmp_path) if ".part" in name]
+
+
+def test_failed_export_keeps_previous_report(tmp_path):
+    filename = str(tmp_path / "report.xlsx")
+    save_report(filename, [["Station 1", 10.0, 100.0, 0, 0]], [])
+    before = open(filename, "rb").read()
+
+    def rows():
+        yield ["Station 1", 1.0, 11.0, 10.0, "Essence"]
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        save_report(filename, [], rows())
+    assert open(filename, "rb").read() == before
+    assert os.listdir(tmp_path) == ["report.xlsx"]
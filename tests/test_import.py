@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pytest
+
+import gas_engine
+from gas_engine import aggregate_categories, parse_csv
+
+
+@pytest.fixture(params=[True, False], ids=["arrow", "csv"])
+def reader(request, monkeypatch):
+    if request.param and not gas_engine.HAVE_ARROW:
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.setattr(gas_engine, "HAVE_ARROW", request.param)
+
+
+def read(text):
+    return parse_csv(io.BytesIO(text.encode("utf-8")))
+
+
+def test_price_column_per_category(reader):
+    # The headers of the calculator's table
+    columns = read(
+        "Station,Pompe,Catégorie,Index initial,Index final,Prix par litre Essence (DH),Prix par litre Gasoil (DH)\n"
+        "1,1,Essence,10,20,12.5,11\n"
+        "1,2,Gasoil,5,15,12.5,11\n"
+    )
+    assert columns["price"].tolist() == [12.5, 11.0]
+    assert aggregate_categories(columns, exact=True)[1] == [10.0, 125.0, 10.0, 110.0]
+
+
+def test_other_category_price_is_not_checked(reader):
+    columns = read(
+        "Station,Pompe,Catégorie,Index initial,Index final,Prix par litre Essence (DH),Prix par litre Gasoil (DH)\n"
+        "1,1,Gasoil,1,3,x,abc\n"
+    )
+    assert columns["errors"][["column", "reason"]].tolist() == [("price", "not a number")]
+    assert np.isnan(columns["price"]).all()
+
+
+def test_infinite_readings_are_not_numbers(reader):
+    columns = read("Station,Pompe,Index initial,Index final\n1,1,10,inf\n1,2,10,20\n")
+    assert columns["errors"][["row", "column", "reason"]].tolist() == [(2, "final", "not a number")]
+    assert columns["final"].tolist() == [20.0]
+
+
+@pytest.mark.parametrize("text", ["Station,Pompe,Index initial,Index final", "Station,Pompe,Index initial,Index final\n"])
+def test_header_only_file_has_no_rows(reader, text):
+    columns = read(text)
+    assert len(columns["station"]) == 0
+    assert len(columns["errors"]) == 0
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from gas_incremental import IncrementalImporter
+
+HEADER = "Station,Pompe,Index initial,Index final\n"
+
+
+@pytest.fixture
+def importer(tmp_path):
+    return IncrementalImporter(str(tmp_path / "state"))
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def write_workbook(path, rows):
+    wb = Workbook()
+    wb.active.append(["Station", "Pompe", "Index initial", "Index final"])
+    for row in rows:
+        wb.active.append(row)
+    wb.save(path)
+
+
+def test_csv_appended_rows_are_added(importer, tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + "1,1,10,20\n")
+    importer.import_file(path)
+    write(path, HEADER + "1,1,10,20\n2,1,5,8\n")
+    _, station_totals, grand_total, new_rows = importer.import_file(path)
+    assert (station_totals, grand_total, new_rows) == ({1: 10.0, 2: 3.0}, 13.0, 1)
+
+
+def test_csv_edited_prefix_is_read_again(importer, tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + "1,1,10,20\n2,1,5,8\n")
+    importer.import_file(path)
+    write(path, HEADER + "1,1,10,25\n2,1,5,8\n3,1,0,1\n")
+    columns, station_totals, grand_total, new_rows = importer.import_file(path)
+    assert (station_totals, grand_total, new_rows) == ({1: 15.0, 2: 3.0, 3: 1.0}, 19.0, 3)
+    assert columns["final"].tolist() == [25.0, 8.0, 1.0]
+
+
+def test_half_written_line_is_left_for_next_time(importer, tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + "1,1,10,20\n2,1,5")
+    columns, station_totals, grand_total, new_rows = importer.import_file(path)
+    assert (station_totals, grand_total, new_rows) == ({1: 10.0}, 10.0, 1)
+    assert len(columns["errors"]) == 0
+
+    write(path, HEADER + "1,1,10,20\n2,1,5,8\n")
+    columns, station_totals, grand_total, new_rows = importer.import_file(path)
+    assert (station_totals, grand_total, new_rows) == ({1: 10.0, 2: 3.0}, 13.0, 1)
+    assert columns["station"].tolist() == [1, 2]
+
+
+def test_workbook_edited_prefix_is_read_again(importer, tmp_path):
+    path = str(tmp_path / "log.xlsx")
+    write_workbook(path, [[1, 1, 10, 20], [2, 1, 5, 8]])
+    importer.import_file(path)
+    write_workbook(path, [[1, 1, 10, 20], [2, 1, 5, 8], [3, 1, 0, 1]])
+    assert importer.import_file(path)[1:] == ({1: 10.0, 2: 3.0, 3: 1.0}, 14.0, 1)
+
+    write_workbook(path, [[1, 1, 10, 25], [2, 1, 5, 8], [3, 1, 0, 1]])
+    assert importer.import_file(path)[1:] == ({1: 15.0, 2: 3.0, 3: 1.0}, 19.0, 3)
+
+
+def test_workbook_appended_rollover_is_counted(importer, tmp_path):
+    path = str(tmp_path / "log.xlsx")
+    write_workbook(path, [[1, 1, 10, 20]])
+    importer.import_file(path)
+    write_workbook(path, [[1, 1, 10, 20], [1, 2, 99990, 5]])
+    assert importer.import_file(path)[1:] == ({1: 25.0}, 25.0, 1)
+
+
+def test_oldest_files_are_dropped_past_max_bytes(tmp_path):
+    importer = IncrementalImporter(str(tmp_path / "state"), max_bytes=1)
+    paths = [str(tmp_path / f"log{i}.csv") for i in range(3)]
+    for path in paths:
+        write(path, HEADER + "1,1,10,20\n")
+        importer.import_file(path)
+    assert list(importer.state["files"]) == [os.path.abspath(paths[-1])]
+    assert len([name for name in os.listdir(importer.folder) if name.endswith(".npz")]) == 1
@@ -0,0 +1,33 @@
+import pytest
+
+from gas_model import Network, build_stations, parse_number
+
+
+@pytest.mark.parametrize("text", ["nan", "NaN", "inf", "-inf", "Infinity", "", "abc", None])
+def test_parse_number_rejects_non_numbers(text):
+    assert parse_number(text) is None
+
+
+def test_non_finite_reading_leaves_totals_usable():
+    stations = build_stations([(1, 0)])
+    network = Network(stations)
+    stations[0].price_essence_text = "10"
+    pump = stations[0].pumps[0]
+    pump.initial_text = "100"
+    pump.final_text = "nan"
+    assert pump.is_invalid("final_text")
+    pump.final_text = "110"
+    assert network.liters_essence == 10
+    assert network.revenue_essence == 100
+
+
+def test_liters_count_both_categories():
+    stations = build_stations([(1, 1), (0, 1)])
+    network = Network(stations)
+    for station in stations:
+        for pump in station.pumps:
+            pump.initial_text = "10"
+            pump.final_text = "15.5"
+    assert [station.liters for station in stations] == [11.0, 5.5]
+    assert network.liters == 16.5
+    assert (network.liters_essence, network.liters_gasoil) == (5.5, 11.0)
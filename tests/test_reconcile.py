@@ -0,0 +1,25 @@
+import zipfile
+
+from gas_export import save_report
+from gas_reconcile import connect_archive, index_archive
+
+
+def test_unreadable_reports_are_skipped_and_remembered(tmp_path):
+    folder = tmp_path / "reports"
+    folder.mkdir()
+    good = folder / "Gas_Station_Report_2026-01-02.xlsx"
+    save_report(str(good), [["Station 1", 10.0, 100.0, 0, 0]], [["Station 1", 1.0, 11.0, 10.0, "Essence"]])
+    # Not a zip file at all, and a zip that is not a workbook
+    (folder / "Gas_Station_Report_2026-01-03.xlsx").write_bytes(b"not a workbook")
+    with zipfile.ZipFile(folder / "Gas_Station_Report_2026-01-04.xlsx", "w") as archive:
+        archive.writestr("readme.txt", "empty")
+
+    conn = connect_archive(str(tmp_path / "readings.db"))
+    try:
+        added, skipped = index_archive(conn, str(folder))
+        assert added == [str(good)]
+        assert [path.rsplit("_", 1)[1] for path, _ in skipped] == ["2026-01-03.xlsx", "2026-01-04.xlsx"]
+        # Known files are not opened again
+        assert index_archive(conn, str(folder)) == ([], [])
+    finally:
+        conn.close()
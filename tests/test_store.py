@@ -0,0 +1,34 @@
+from gas_export import save_report
+from gas_store import ReadingStore, ingest_file
+
+HEADER = "Station,Pompe,Index initial,Index final\n"
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_ingest_meter_log(tmp_path):
+    store = ReadingStore(str(tmp_path / "store"))
+    path = str(tmp_path / "meters_2026-01-02.csv")
+    write(path, HEADER + "1,1,10,20\n2,1,5,8\n")
+    assert ingest_file(store, path) == 2
+    assert store.liters_by("station") == {1: 10.0, 2: 3.0}
+    assert store.liters_by("station", "2026-01-03") == {}
+
+
+def test_ingest_counts_meter_rollover(tmp_path):
+    store = ReadingStore(str(tmp_path / "store"))
+    path = str(tmp_path / "meters_2026-01-02.csv")
+    write(path, HEADER + "1,1,10,20\n1,2,99990,5\n")
+    assert ingest_file(store, path) == 2
+    assert store.liters_by("station") == {1: 25.0}
+
+
+def test_ingest_saved_report_by_category(tmp_path):
+    store = ReadingStore(str(tmp_path / "store"))
+    path = str(tmp_path / "Gas_Station_Report_2026-01-02.xlsx")
+    save_report(path, [], [["Station 1", 1.0, 11.0, 10.0, "Essence"], ["Station 1", 5.0, 8.0, 3.0, "Gasoil"]])
+    assert ingest_file(store, path) == 2
+    assert store.liters_by("category", "2026-01-02", "2026-01-03") == {0: 10.0, 1: 3.0}